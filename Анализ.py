@@ -0,0 +1,170 @@
+import argparse
+import collections
+import contextlib
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+from Движок import Engine
+from Кеш_позиций import best_move
+import Шахматы
+import Шашки
+
+
+GAMES = {'chess': Шахматы.Board, 'checkers': Шашки.Board}
+SIDES = {'w': 'white', 'b': 'black', 'white': 'white', 'black': 'black'}
+
+
+def analyse(task):
+    """Функция для анализа одной позиции в процессе пула.
+
+    Args:
+        task (tuple): игра, строка с позицией и стороной, глубина и
+        ограничение времени на поиск
+
+    Returns:
+        dict: результат для записи в JSONL; при любой ошибке в позиции -
+        запись с ключом 'error', чтобы одна позиция не прерывала весь поток
+    """
+
+    game, line, depth, time_limit = task
+    result = {'position': line}
+    try:
+        text, side = line.split()
+        color = SIDES[side]
+        board = GAMES[game].from_text(text)
+    except Exception as error:
+        result['error'] = f'Некорректная позиция: {error!r}'
+        return result
+
+    try:
+        if time_limit:
+            move, score = Engine(max_depth=depth, time_limit=time_limit).search(board, color)
+        else:
+            move, score = best_move(board, color, depth)
+        result['side'] = color
+        result['moves'] = len(board.all_moves(color))
+        result['best'] = '-'.join(Шашки.Game.format_position(square) for square in move[:2]) if move else None
+        result['score'] = score if move else None
+        result['evaluation'] = board.evaluate(color)
+    except Exception as error:
+        return {'position': line, 'error': f'Ошибка анализа: {error!r}'}
+    return result
+
+
+def collect(line, pending):
+    """Функция для получения результата позиции из пула. Ошибка, которая
+    не была поймана в процессе (например, при передаче результата),
+    превращается в запись с ключом 'error'.
+
+    Args:
+        line (str): строка с позицией
+        pending (AsyncResult): задача пула
+
+    Returns:
+        dict: результат для записи в JSONL
+    """
+
+    try:
+        return pending.get()
+    except Exception as error:
+        return {'position': line, 'error': f'Ошибка анализа: {error!r}'}
+
+
+def run(game, lines, output, workers, depth, time_limit=None, inflight=None):
+    """Функция для анализа потока позиций пулом процессов.
+
+    В работе одновременно находится не больше inflight позиций, поэтому
+    память не растет с размером входного файла. Результаты записываются
+    в порядке входных строк.
+
+    Args:
+        game (str): 'chess' или 'checkers'
+        lines (iterable): строки с позициями
+        output (file): файл для записи JSONL
+        workers (int): кол-во процессов
+        depth (int): глубина перебора
+        time_limit (float): ограничение времени на позицию в секундах
+        inflight (int): максимальное кол-во позиций в работе, по умолчанию 4 на процесс
+
+    Returns:
+        tuple: кол-во позиций и время в секундах
+    """
+
+    inflight = inflight or 4 * workers
+    pending = collections.deque()
+    count = 0
+    started = time.perf_counter()
+    with multiprocessing.Pool(workers) as pool:
+        for line in lines:
+            line = line.strip()
+            if not line:
+                continue
+            pending.append((line, pool.apply_async(analyse, ((game, line, depth, time_limit),))))
+            if len(pending) >= inflight:
+                output.write(json.dumps(collect(*pending.popleft()), ensure_ascii=False) + '\n')
+                count += 1
+        while pending:
+            output.write(json.dumps(collect(*pending.popleft()), ensure_ascii=False) + '\n')
+            count += 1
+    return count, time.perf_counter() - started
+
+
+def scaling(game, lines, worker_counts, depth, time_limit=None):
+    """Функция для замера скорости при разном кол-ве процессов.
+
+    Args:
+        game (str): 'chess' или 'checkers'
+        lines (list): строки с позициями
+        worker_counts (list): кол-ва процессов для замера
+        depth (int): глубина перебора
+        time_limit (float): ограничение времени на позицию в секундах
+
+    Returns:
+        list: тройки (кол-во процессов, позиций в секунду, ускорение)
+    """
+
+    results = []
+    base = None
+    with open(os.devnull, 'w') as output:
+        for workers in worker_counts:
+            count, elapsed = run(game, lines, output, workers, depth, time_limit)
+            speed = count / elapsed if elapsed else 0.0
+            base = base or speed
+            results.append((workers, speed, speed / base if base else 0.0))
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Пакетный анализ позиций: кол-во ходов, лучший ход и оценка')
+    parser.add_argument('game', choices=sorted(GAMES), help='игра')
+    parser.add_argument('input', nargs='?', default='-',
+                        help='файл с позициями "<8 рядов через /> <w|b>" по одной на строку, "-" - stdin')
+    parser.add_argument('-o', '--output', default='-', help='файл JSONL для результатов, "-" - stdout')
+    parser.add_argument('-j', '--workers', type=int, default=os.cpu_count(), help='кол-во процессов')
+    parser.add_argument('--depth', type=int, default=4, help='глубина перебора')
+    parser.add_argument('--time-limit', type=float, default=None, help='время на позицию в секундах')
+    parser.add_argument('--inflight', type=int, default=None, help='максимальное кол-во позиций в работе')
+    parser.add_argument('--scaling', default=None,
+                        help='замер скорости для кол-в процессов через запятую, например 1,2,4')
+    args = parser.parse_args()
+
+    with (contextlib.nullcontext(sys.stdin) if args.input == '-'
+          else open(args.input, encoding='utf-8')) as source:
+        if args.scaling:
+            lines = [line for line in source if line.strip()]
+            print('Процессов  Позиций/с  Ускорение')
+            for workers, speed, speedup in scaling(args.game, lines,
+                                                   [int(el) for el in args.scaling.split(',')],
+                                                   args.depth, args.time_limit):
+                print(f'{workers:9d}  {speed:9.1f}  {speedup:9.2f}')
+        else:
+            with (contextlib.nullcontext(sys.stdout) if args.output == '-'
+                  else open(args.output, 'w', encoding='utf-8')) as output:
+                count, elapsed = run(args.game, source, output, args.workers, args.depth,
+                                     args.time_limit, args.inflight)
+                output.flush()
+            print(f'Позиций: {count} за {elapsed:.2f} с, {count / elapsed if elapsed else 0:.1f} позиций/с',
+                  file=sys.stderr)
@@ -0,0 +1,242 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import time
+
+import Шахматы
+import Шашки
+from Кеш_позиций import CACHE
+from Перфт_шашек import MIDDLE
+
+
+CHESS_POSITIONS = [
+    Шахматы.Board().to_text(),
+    'rnbqkbnr/Cp.pp.../.s.h.c../p.p...pp/P....p../NS.H..../.PPPPPPP/R.BQKBNR',
+]
+CHECKERS_POSITIONS = [Шашки.Board().to_text(), MIDDLE]
+CHECKERS_CAPTURES = [
+    '......../......../..n.n.../......../..n.n.../...N..../......../........',
+    '......../.n....../......../...n..../......../.n...n../......../...Q....',
+]
+CHESS_LINE = [((7, 6), (5, 7)), ((0, 6), (2, 7)), ((5, 7), (7, 6)), ((2, 7), (0, 6))]
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_baseline.json')
+
+
+def movegen_case(board_class, texts, kind):
+    """Функция для замера генерации ходов одного класса фигур: ходы всех
+    фигур этого класса в заданных позициях.
+
+    Args:
+        board_class (type): класс доски
+        texts (list): позиции в текстовой записи
+        kind (type): класс фигуры
+
+    Returns:
+        tuple: функция подготовки и замеряемая функция
+    """
+
+    targets = []
+    for text in texts:
+        board = board_class.from_text(text)
+        for color in ['white', 'black']:
+            for position, piece in board.pieces[color].items():
+                if type(piece) == kind:
+                    targets.append((board, piece, position))
+
+    def run(_):
+        for board, piece, position in targets:
+            piece.get_possible_moves(board, position)
+
+    return (lambda: None), run
+
+
+def chess_game(moves):
+    """Функция для создания шахматной партии с уже сделанными ходами.
+
+    Args:
+        moves (int): кол-во ходов из CHESS_LINE
+
+    Returns:
+        Шахматы.Game: партия
+    """
+
+    game = Шахматы.Game()
+    for start, end in CHESS_LINE[:moves]:
+        game.make_move(start, end)
+        game.move_count += 1
+        game.player = 'black' if game.player == 'white' else 'white'
+    return game
+
+
+def quiet(func, *args):
+    """Функция для вызова функции без вывода в консоль.
+
+    Args:
+        func: функция
+        *args: аргументы функции
+    """
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        func(*args)
+
+
+def uncached(setup):
+    """Функция для подготовки замера без общего кеша позиций: кеш
+    очищается перед каждой операцией, чтобы замерялась сама работа, а не
+    попадание в кеш.
+
+    Args:
+        setup: функция подготовки
+
+    Returns:
+        функция подготовки с очисткой кеша
+    """
+
+    def prepare():
+        CACHE.clear()
+        return setup()
+
+    return prepare
+
+
+def build_cases():
+    """Функция для построения набора замеров.
+
+    Returns:
+        dict: имя замера -> (функция подготовки, замеряемая функция);
+        подготовка не входит во время, ее результат передается замеряемой
+        функции
+    """
+
+    cases = {}
+    for kind in Шахматы.piece_classes():
+        cases[f'chess.movegen.{kind.__name__}'] = movegen_case(Шахматы.Board, CHESS_POSITIONS, kind)
+    for kind in Шашки.Checker.__subclasses__():
+        cases[f'checkers.movegen.{kind.__name__}'] = movegen_case(Шашки.Board, CHECKERS_POSITIONS, kind)
+
+    capture_boards = [Шашки.Board.from_text(text) for text in CHECKERS_CAPTURES]
+    cases['checkers.captures'] = ((lambda: capture_boards),
+                                  lambda boards: [board.all_moves('white') for board in boards])
+
+    cases['chess.make_move'] = (uncached(lambda: chess_game(0)),
+                                lambda game: game.make_move(*CHESS_LINE[0]))
+    cases['chess.rollback'] = ((lambda: chess_game(len(CHESS_LINE))),
+                               lambda game: game.rollback(2))
+    cases['checkers.make_move'] = (uncached(Шашки.Game), lambda game: game.make_move((5, 0), (4, 1)))
+
+    chess_board = Шахматы.Board.from_text(CHESS_POSITIONS[1])
+    checkers_board = Шашки.Board.from_text(MIDDLE)
+    cases['chess.display'] = ((lambda: chess_board), lambda board: quiet(board.display))
+    cases['checkers.display'] = ((lambda: checkers_board), lambda board: quiet(board.display))
+
+    hint_game = chess_game(0)
+    cases['chess.render_hint'] = (uncached(lambda: hint_game), lambda game: game.render_hint((7, 3)))
+    cases['chess.help_func'] = (uncached(lambda: hint_game), lambda game: quiet(game.help_func, (7, 3)))
+    cases['chess.help_func.cached'] = ((lambda: hint_game), lambda game: quiet(game.help_func, (7, 3)))
+    return cases
+
+
+def measure(setup, run, number, repeats):
+    """Функция для замера времени одной операции. Берется лучшая из серий,
+    чтобы случайные задержки системы не влияли на результат.
+
+    Args:
+        setup: функция подготовки, не входит во время
+        run: замеряемая функция
+        number (int): кол-во операций в серии
+        repeats (int): кол-во серий
+
+    Returns:
+        float: время одной операции в микросекундах
+    """
+
+    best = None
+    for _ in range(repeats):
+        total = 0.0
+        for _ in range(number):
+            arg = setup()
+            started = time.perf_counter()
+            run(arg)
+            total += time.perf_counter() - started
+        best = total if best is None else min(best, total)
+    return best / number * 1e6
+
+
+def run_suite(number=200, repeats=5, only=None):
+    """Функция для прогона всех замеров.
+
+    Args:
+        number (int): кол-во операций в серии
+        repeats (int): кол-во серий
+        only (str): выполнить только замеры, в имени которых есть эта строка
+
+    Returns:
+        dict: имя замера -> время одной операции в микросекундах
+    """
+
+    results = {}
+    for name, (setup, run) in build_cases().items():
+        if only and only not in name:
+            continue
+        results[name] = measure(setup, run, number, repeats)
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Функция для сравнения результатов с эталоном.
+
+    Args:
+        results (dict): имя замера -> время в микросекундах
+        baseline (dict): то же для эталона
+        threshold (float): допустимое замедление, 0.2 - на 20%
+
+    Returns:
+        list: тройки (имя, время, отношение к эталону) для замедлившихся замеров
+    """
+
+    regressions = []
+    for name, value in results.items():
+        base = baseline.get(name)
+        if base and value > base * (1 + threshold):
+            regressions.append((name, value, value / base))
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Замеры скорости основных операций шахмат и шашек')
+    parser.add_argument('--baseline', default=BASELINE, help='файл JSON с эталоном')
+    parser.add_argument('--save', action='store_true', help='записать результаты как новый эталон')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='допустимое замедление относительно эталона, 0.2 - на 20%%')
+    parser.add_argument('--number', type=int, default=200, help='кол-во операций в серии')
+    parser.add_argument('--repeats', type=int, default=5, help='кол-во серий')
+    parser.add_argument('--only', default=None, help='выполнить только замеры с этой строкой в имени')
+    args = parser.parse_args()
+
+    results = run_suite(args.number, args.repeats, args.only)
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding='utf-8') as file:
+            baseline = json.load(file)['results']
+    for name, value in results.items():
+        base = baseline.get(name)
+        change = f'{(value / base - 1) * 100:+7.1f}%' if base else '       -'
+        print(f'{name:32s} {value:12.2f} мкс {change}')
+
+    if args.save:
+        with open(args.baseline, 'w', encoding='utf-8') as file:
+            json.dump({'python': sys.version.split()[0], 'platform': platform.platform(),
+                       'number': args.number, 'repeats': args.repeats,
+                       'results': {name: round(value, 3) for name, value in results.items()}},
+                      file, ensure_ascii=False, indent=1)
+        print(f'Эталон записан в {args.baseline}')
+    else:
+        regressions = compare(results, baseline, args.threshold)
+        for name, value, ratio in regressions:
+            print(f'ЗАМЕДЛЕНИЕ {name}: {value:.2f} мкс, в {ratio:.2f} раза медленнее эталона')
+        if regressions:
+            sys.exit(1)
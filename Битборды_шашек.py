@@ -0,0 +1,243 @@
+import argparse
+import random
+import time
+
+import numpy as np
+
+from Движок import opponent
+import Шашки
+
+
+KINDS = [('white', Шашки.Normal), ('white', Шашки.Queen), ('black', Шашки.Normal), ('black', Шашки.Queen)]
+DIRECTIONS = [(-1, -1), (-1, 1), (1, -1), (1, 1)]
+NOT_FIRST_COL = np.uint64(sum(1 << (string * 8 + col) for string in range(8) for col in range(1, 8)))
+NOT_LAST_COL = np.uint64(sum(1 << (string * 8 + col) for string in range(8) for col in range(7)))
+POPCOUNT = np.array([bin(indx).count('1') for indx in range(256)], dtype=np.int64)
+
+
+def shift(bits, direction):
+    """Функция для сдвига всех шашек на одну клетку по диагонали.
+    Шашки, которые вышли бы за край поля, пропадают.
+
+    Args:
+        bits (numpy.ndarray): маски клеток, бит string * 8 + col
+        direction (tuple): направление (по строкам, по столбцам)
+
+    Returns:
+        numpy.ndarray: сдвинутые маски
+    """
+
+    dir_str, dir_col = direction
+    bits = bits & (NOT_LAST_COL if dir_col > 0 else NOT_FIRST_COL)
+    delta = dir_str * 8 + dir_col
+    return bits << np.uint64(delta) if delta > 0 else bits >> np.uint64(-delta)
+
+
+def popcount(bits):
+    """Функция для подсчета единичных битов в каждой маске. В NumPy 2
+    используется встроенный bitwise_count, иначе таблица по байтам.
+
+    Args:
+        bits (numpy.ndarray): маски
+
+    Returns:
+        numpy.ndarray: кол-во битов в каждой маске
+    """
+
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(bits).astype(np.int64)
+    bits = np.ascontiguousarray(bits, dtype=np.uint64)
+    return POPCOUNT[bits.view(np.uint8)].reshape(len(bits), 8).sum(axis=1)
+
+
+class BitBoards(object):
+    """Пакет позиций шашек в виде битовых масок: по маске uint64 на
+    каждый вид шашки, бит string * 8 + col - шашка на клетке.
+
+    Attributes:
+        masks (dict): (цвет, класс шашки) -> numpy.ndarray масок
+        count (int): кол-во позиций
+    """
+
+    def __init__(self, masks):
+        """Инициализация пакета.
+
+        Args:
+            masks (dict): (цвет, класс шашки) -> numpy.ndarray масок
+        """
+
+        self.masks = masks
+        self.count = len(masks[KINDS[0]])
+
+    @classmethod
+    def from_boards(cls, boards):
+        """Метод для упаковки списка досок.
+
+        Args:
+            boards (list): доски Шашки.Board
+
+        Returns:
+            BitBoards: пакет позиций
+        """
+
+        masks = {kind: np.zeros(len(boards), dtype=np.uint64) for kind in KINDS}
+        for indx, board in enumerate(boards):
+            for color in ['white', 'black']:
+                for (string, col), checker in board.pieces[color].items():
+                    masks[(color, type(checker))][indx] |= np.uint64(1 << (string * 8 + col))
+        return cls(masks)
+
+    @classmethod
+    def from_batch(cls, batch):
+        """Метод для перевода пакета из Пакет_позиций без сборки досок.
+
+        Args:
+            batch (PositionBatch): пакет позиций шашек
+
+        Returns:
+            BitBoards: пакет позиций
+        """
+
+        layout = batch.layout
+        records = np.frombuffer(batch.buffer, dtype=np.uint8, count=batch.count * layout.record_size)
+        squares = records.reshape(batch.count, layout.record_size)[:, :-1]
+        weights = np.array([1 << (string * 8 + col) for string, col in layout.squares], dtype=np.uint64)
+        masks = {}
+        for symbol, (kind, color) in layout.classes.items():
+            selected = np.where(squares == layout.codes[symbol], weights, np.uint64(0))
+            masks[(color, kind)] = np.bitwise_or.reduce(selected, axis=1)
+        return cls(masks)
+
+    def count_moves(self, color):
+        """Метод для подсчета ходов и взятий стороны во всех позициях сразу.
+
+        Правила те же, что у Normal и Queen: простая шашка ходит и бьет
+        только вперед и, если может бить, только бьет; дамка ходит по
+        диагонали на любое расстояние и бьет все фигуры соперника на пути,
+        если между ними есть пустые клетки, ход без взятия у дамки остается
+        допустимым.
+
+        Args:
+            color (str): цвет стороны
+
+        Returns:
+            tuple: numpy.ndarray кол-ва ходов и numpy.ndarray кол-ва взятий
+        """
+
+        own = self.masks[(color, Шашки.Normal)] | self.masks[(color, Шашки.Queen)]
+        other = opponent(color)
+        enemy = self.masks[(other, Шашки.Normal)] | self.masks[(other, Шашки.Queen)]
+        empty = ~(own | enemy)
+
+        normal = self.masks[(color, Шашки.Normal)]
+        forward = -1 if color == 'white' else 1
+        jumps, steps = [], []
+        for dir_col in [-1, 1]:
+            back = (-forward, -dir_col)
+            over = shift(enemy, back)
+            jumps.append(normal & over & shift(shift(empty, back), back))
+            steps.append(normal & shift(empty, back))
+        can_jump = jumps[0] | jumps[1]
+        captures = popcount(jumps[0]) + popcount(jumps[1])
+        moves = captures + popcount(steps[0] & ~can_jump) + popcount(steps[1] & ~can_jump)
+
+        queen = self.masks[(color, Шашки.Queen)]
+        for direction in DIRECTIONS:
+            clean, taken, after_enemy = queen, np.zeros_like(queen), np.zeros_like(queen)
+            for _ in range(7):
+                if not (clean | taken | after_enemy).any():
+                    break
+                clean, taken, after_enemy = shift(clean, direction), shift(taken, direction), \
+                    shift(after_enemy, direction)
+                quiet = clean & empty
+                capture = (taken | after_enemy) & empty
+                moves += popcount(quiet) + popcount(capture)
+                captures += popcount(capture)
+                clean, taken, after_enemy = quiet, capture, (clean | taken) & enemy
+        return moves, captures
+
+    def summary(self):
+        """Метод для подсчета ходов и взятий обеих сторон.
+
+        Returns:
+            dict: 'white_moves', 'white_captures', 'black_moves',
+            'black_captures' - numpy.ndarray по позициям
+        """
+
+        result = {}
+        for color in ['white', 'black']:
+            result[f'{color}_moves'], result[f'{color}_captures'] = self.count_moves(color)
+        return result
+
+
+def random_boards(count, seed=0, max_plies=80):
+    """Функция для получения позиций случайными партиями.
+
+    Args:
+        count (int): кол-во позиций
+        seed (int): начальное значение генератора случайных чисел
+        max_plies (int): максимальная длина одной партии
+
+    Returns:
+        list: доски
+    """
+
+    rng = random.Random(seed)
+    boards = []
+    board, color, plies = Шашки.Board(), 'white', 0
+    while len(boards) < count:
+        moves = board.all_moves(color)
+        if not moves or plies >= max_plies:
+            board, color, plies = Шашки.Board(), 'white', 0
+            continue
+        board.apply_move(rng.choice(moves))
+        color = opponent(color)
+        plies += 1
+        boards.append(Шашки.Board.from_text(board.to_text()))
+    return boards
+
+
+def check(boards):
+    """Функция для сверки пакетного подсчета с Board.all_moves.
+
+    Args:
+        boards (list): доски
+
+    Returns:
+        int: кол-во позиций, где результаты разошлись
+    """
+
+    summary = BitBoards.from_boards(boards).summary()
+    mismatches = 0
+    for indx, board in enumerate(boards):
+        for color in ['white', 'black']:
+            moves = board.all_moves(color)
+            expected = (len(moves), sum(1 for move in moves if move[2]))
+            got = (summary[f'{color}_moves'][indx], summary[f'{color}_captures'][indx])
+            if expected != got:
+                mismatches += 1
+                print(f'{board.to_text()} {color}: ожидалось {expected}, получено {got}')
+    return mismatches
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Пакетный подсчет ходов и взятий в шашках')
+    parser.add_argument('--count', type=int, default=10000, help='кол-во случайных позиций')
+    parser.add_argument('--check', action='store_true', help='сверить с Board.all_moves')
+    args = parser.parse_args()
+
+    boards = random_boards(args.count)
+    if args.check:
+        mismatches = check(boards)
+        print('Все значения совпали' if not mismatches else f'Расхождений: {mismatches}')
+    bitboards = BitBoards.from_boards(boards)
+    started = time.perf_counter()
+    bitboards.summary()
+    batch_time = time.perf_counter() - started
+    started = time.perf_counter()
+    for board in boards:
+        board.all_moves('white')
+        board.all_moves('black')
+    loop_time = time.perf_counter() - started
+    print(f'Пакетно: {batch_time / len(boards) * 1e6:.2f} мкс/позиция, '
+          f'all_moves: {loop_time / len(boards) * 1e6:.2f} мкс/позиция')
@@ -0,0 +1,404 @@
+import random
+import time
+from array import array
+
+from История_позиций import PositionHistory
+from Таблицы import load_table, table_name
+
+
+INF = 10 ** 6
+WIN = 10 ** 5
+SIDE_KEY = 0x9E3779B97F4A7C15
+
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+
+class SearchTimeout(Exception):
+    """Исключение, которым прерывается перебор при исчерпании времени или
+    по сигналу остановки."""
+
+
+def make_zobrist(symbols, seed):
+    """Функция для построения таблицы случайных ключей Зобриста. Ключи
+    строятся один раз и хранятся в файле таблицы.
+
+    Args:
+        symbols (str): символы фигур
+        seed (int): зерно генератора, чтобы ключи были одинаковыми при каждом запуске
+
+    Returns:
+        dict: ключи для каждой пары (символ, строка, столбец)
+    """
+
+    squares = [(symbol, string, col) for symbol in symbols for string in range(8) for col in range(8)]
+
+    def build():
+        rng = random.Random(seed)
+        return {square: rng.getrandbits(64) for square in squares}
+
+    def decode(data):
+        with data.cast('Q') as keys:
+            if len(keys) != len(squares):
+                raise ValueError('Длина данных не совпадает с таблицей ключей')
+            return dict(zip(squares, keys))
+
+    return load_table(table_name('zobrist', symbols, seed), build,
+                      lambda table: array('Q', [table[square] for square in squares]).tobytes(), decode)
+
+
+def opponent(color):
+    """Функция для получения цвета соперника.
+
+    Args:
+        color (str): цвет стороны
+
+    Returns:
+        str: цвет другой стороны
+    """
+
+    return 'black' if color == 'white' else 'white'
+
+
+class Engine(object):
+    """Движок для поиска лучшего хода перебором с альфа-бета отсечением.
+
+    Движок не зависит от конкретной игры: доска должна иметь атрибут key
+    (хеш позиции) и методы all_moves, apply_move, undo_move, capture_gain
+    и evaluate. Поиск идет итеративным углублением, позиции запоминаются
+    в таблице транспозиций, на нулевой глубине досчитываются взятия.
+    Позиция, которая уже встречалась в партии или на текущей ветке
+    перебора, сразу оценивается как ничья.
+
+    Attributes:
+        max_depth (int): максимальная глубина перебора
+        time_limit (float): ограничение времени на поиск в секундах либо None
+        table_size (int): максимальное кол-во записей в таблице транспозиций
+        table (dict): таблица транспозиций, ключ позиции ->
+        (глубина, оценка, тип оценки, лучший ход)
+        stop_event (threading.Event): сигнал остановки поиска из другого
+        потока либо None
+        positions (PositionHistory): позиции партии и текущей ветки перебора
+        nodes (int): кол-во просмотренных позиций в последнем поиске
+        depth_times (list): пары (глубина, время от начала поиска) для
+        каждой завершенной итерации
+    """
+
+    def __init__(self, max_depth=6, time_limit=None, table_size=1 << 20, stop_event=None):
+        """Инициализация движка.
+
+        Args:
+            max_depth (int): максимальная глубина перебора
+            time_limit (float): ограничение времени на поиск в секундах
+            table_size (int): максимальное кол-во записей в таблице транспозиций
+            stop_event (threading.Event): сигнал остановки поиска
+        """
+
+        self.max_depth = max_depth
+        self.time_limit = time_limit
+        self.table_size = table_size
+        self.stop_event = stop_event
+        self.table = {}
+        self.nodes = 0
+        self.depth_times = []
+        self.elapsed = 0.0
+        self.deadline = None
+        self.positions = PositionHistory()
+
+    def search(self, board, color, history=None, callback=None):
+        """Метод для поиска лучшего хода.
+
+        Args:
+            board (Board): доска, после поиска она остается в исходном состоянии
+            color (str): цвет стороны, которая ходит
+            history (PositionHistory): история партии для правил ничьей;
+            она не изменяется
+            callback: функция callback(depth, move, score), вызывается после
+            каждой завершенной итерации
+
+        Returns:
+            tuple: лучший ход и его оценка; ход None, если ходов нет
+        """
+
+        self.nodes = 0
+        self.depth_times = []
+        started = time.perf_counter()
+        self.deadline = started + self.time_limit if self.time_limit else None
+        self.positions = history.copy() if history is not None else PositionHistory()
+        root_key = self.position_key(board, color)
+        if not self.positions.keys or self.positions.keys[-1] != root_key:
+            self.positions.push(root_key)
+        best_move, best_score = None, -INF
+        moves = board.all_moves(color)
+        if moves:
+            best_move = moves[0]
+        for depth in range(1, self.max_depth + 1):
+            try:
+                score, move = self.root(board, color, depth)
+            except SearchTimeout:
+                break
+            if move is not None:
+                best_move, best_score = move, score
+            self.depth_times.append((depth, time.perf_counter() - started))
+            if callback is not None:
+                callback(depth, best_move, best_score)
+            if abs(score) >= WIN - 1000:
+                break
+        self.elapsed = time.perf_counter() - started
+        return best_move, best_score
+
+    def root(self, board, color, depth):
+        """Метод для перебора ходов в корне дерева на заданную глубину.
+
+        Args:
+            board (Board): доска
+            color (str): цвет стороны, которая ходит
+            depth (int): глубина перебора
+
+        Returns:
+            tuple: оценка и лучший ход
+        """
+
+        score = self.negamax(board, color, depth, -INF, INF, 0)
+        entry = self.table.get(self.position_key(board, color))
+        return score, entry[3] if entry else None
+
+    def negamax(self, board, color, depth, alpha, beta, ply):
+        """Метод перебора с альфа-бета отсечением в форме негамакс.
+
+        Args:
+            board (Board): доска
+            color (str): цвет стороны, которая ходит
+            depth (int): оставшаяся глубина
+            alpha (int): нижняя граница окна
+            beta (int): верхняя граница окна
+            ply (int): расстояние от корня
+
+        Returns:
+            int: оценка позиции для стороны color
+        """
+
+        self.count_node()
+        if depth <= 0:
+            return self.quiescence(board, color, alpha, beta, ply)
+
+        key = self.position_key(board, color)
+        entry = self.table.get(key)
+        table_move = None
+        if entry:
+            entry_depth, entry_score, flag, table_move = entry
+            if entry_depth >= depth:
+                if flag == EXACT:
+                    return entry_score
+                if flag == LOWER:
+                    alpha = max(alpha, entry_score)
+                elif flag == UPPER:
+                    beta = min(beta, entry_score)
+                if alpha >= beta:
+                    return entry_score
+
+        moves = board.all_moves(color)
+        if not moves:
+            return -WIN + ply
+
+        start_alpha = alpha
+        best_score, best_move = -INF, None
+        for move in self.order_moves(board, moves, table_move):
+            progress = board.capture_gain(move) > 0
+            undo = board.apply_move(move)
+            try:
+                score = -self.child(board, opponent(color), depth - 1, -beta, -alpha, ply + 1, progress)
+            finally:
+                board.undo_move(undo)
+            if score > best_score:
+                best_score, best_move = score, move
+            alpha = max(alpha, score)
+            if alpha >= beta:
+                break
+
+        if best_score <= start_alpha:
+            flag = UPPER
+        elif best_score >= beta:
+            flag = LOWER
+        else:
+            flag = EXACT
+        self.store(key, depth, best_score, flag, best_move)
+        return best_score
+
+    def child(self, board, color, depth, alpha, beta, ply, progress):
+        """Метод для перебора позиции после хода с учетом правил ничьей.
+        Повтор позиции оценивается как ничья без перебора.
+
+        Args:
+            board (Board): доска после хода
+            color (str): цвет стороны, которая ходит
+            depth (int): оставшаяся глубина
+            alpha (int): нижняя граница окна
+            beta (int): верхняя граница окна
+            ply (int): расстояние от корня
+            progress (bool): было ли ходом взятие
+
+        Returns:
+            int: оценка позиции для стороны color
+        """
+
+        key = self.position_key(board, color)
+        if self.positions.count(key):
+            return 0
+        self.positions.push(key, progress)
+        try:
+            if self.positions.is_draw():
+                return 0
+            return self.negamax(board, color, depth, alpha, beta, ply)
+        finally:
+            self.positions.pop()
+
+    def quiescence(self, board, color, alpha, beta, ply):
+        """Метод для досчета взятий, чтобы не оценивать позицию посреди размена.
+
+        Args:
+            board (Board): доска
+            color (str): цвет стороны, которая ходит
+            alpha (int): нижняя граница окна
+            beta (int): верхняя граница окна
+            ply (int): расстояние от корня
+
+        Returns:
+            int: оценка позиции для стороны color
+        """
+
+        moves = board.all_moves(color)
+        if not moves:
+            return -WIN + ply
+        stand = board.evaluate(color)
+        if stand >= beta:
+            return stand
+        alpha = max(alpha, stand)
+
+        captures = [(board.capture_gain(move), move) for move in moves]
+        captures = [tup for tup in captures if tup[0] > 0]
+        captures.sort(key=lambda tup: tup[0], reverse=True)
+        for _, move in captures:
+            self.count_node()
+            undo = board.apply_move(move)
+            try:
+                score = -self.quiescence(board, opponent(color), -beta, -alpha, ply + 1)
+            finally:
+                board.undo_move(undo)
+            if score >= beta:
+                return score
+            alpha = max(alpha, score)
+        return alpha
+
+    def order_moves(self, board, moves, table_move):
+        """Метод для упорядочивания ходов: сначала ход из таблицы
+        транспозиций, затем взятия по убыванию выигрыша, затем тихие ходы.
+
+        Args:
+            board (Board): доска
+            moves (list): список ходов
+            table_move (tuple): лучший ход из таблицы либо None
+
+        Returns:
+            list: упорядоченный список ходов
+        """
+
+        ordered = sorted(moves, key=board.capture_gain, reverse=True)
+        if table_move in moves:
+            ordered.remove(table_move)
+            ordered.insert(0, table_move)
+        return ordered
+
+    def store(self, key, depth, score, flag, move):
+        """Метод для записи позиции в таблицу транспозиций.
+
+        Args:
+            key (int): ключ позиции
+            depth (int): глубина, на которую посчитана оценка
+            score (int): оценка
+            flag (int): EXACT, LOWER или UPPER
+            move (tuple): лучший ход
+        """
+
+        if len(self.table) >= self.table_size and key not in self.table:
+            self.table.clear()
+        self.table[key] = (depth, score, flag, move)
+
+    def count_node(self):
+        """Метод для подсчета узлов и проверки ограничения по времени и
+        сигнала остановки. Сигнал остановки - простой флаг, он проверяется
+        в каждом узле; часы опрашиваются раз в 64 узла.
+
+        Raises:
+            SearchTimeout: если время на поиск вышло или поиск остановлен
+        """
+
+        self.nodes += 1
+        if self.stop_event is not None and self.stop_event.is_set():
+            raise SearchTimeout()
+        if not self.nodes & 63 and self.deadline and time.perf_counter() > self.deadline:
+            raise SearchTimeout()
+
+    @staticmethod
+    def position_key(board, color):
+        """Метод для получения ключа позиции с учетом очереди хода.
+
+        Args:
+            board (Board): доска
+            color (str): цвет стороны, которая ходит
+
+        Returns:
+            int: ключ позиции
+        """
+
+        return board.key ^ SIDE_KEY if color == 'black' else board.key
+
+    def principal_variation(self, board, color, max_length=64):
+        """Метод для получения главной линии по лучшим ходам из таблицы
+        транспозиций. Линия обрывается на повторе позиции.
+
+        Args:
+            board (Board): доска, после вызова она остается в исходном состоянии
+            color (str): цвет стороны, которая ходит
+            max_length (int): максимальная длина линии
+
+        Returns:
+            list: ходы главной линии
+        """
+
+        line, undos, seen = [], [], set()
+        try:
+            while len(line) < max_length:
+                key = self.position_key(board, color)
+                entry = self.table.get(key)
+                if key in seen or not entry or entry[3] not in board.all_moves(color):
+                    break
+                seen.add(key)
+                line.append(entry[3])
+                undos.append(board.apply_move(entry[3]))
+                color = opponent(color)
+        finally:
+            for undo in reversed(undos):
+                board.undo_move(undo)
+        return line
+
+    def nodes_per_second(self):
+        """Метод для получения скорости последнего поиска.
+
+        Returns:
+            float: кол-во узлов в секунду
+        """
+
+        return self.nodes / self.elapsed if self.elapsed else 0.0
+
+    def report(self):
+        """Метод для получения отчета о последнем поиске.
+
+        Returns:
+            str: время достижения каждой глубины, кол-во узлов и скорость
+        """
+
+        depths = ', '.join(f'{depth}: {seconds:.3f} с' for depth, seconds in self.depth_times)
+        return (f'Глубины ({depths}); узлов: {self.nodes}, '
+                f'{self.nodes_per_second():.0f} узлов/с')
@@ -0,0 +1,133 @@
+import argparse
+import multiprocessing
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import Таблицы
+
+
+def warm_up(_=None):
+    """Функция для первого обращения ко всем таблицам: ключи Зобриста
+    загружаются при импорте игр, таблицы ходов фигур - при первом запросе.
+    Игры импортируются здесь, а не в начале модуля, чтобы каталог таблиц
+    брался из окружения процесса, в котором идет замер.
+
+    Returns:
+        int: кол-во ходов из начальных позиций
+    """
+
+    import Шахматы
+    import Шашки
+
+    count = 0
+    for color in ['white', 'black']:
+        count += len(Шахматы.Board().all_moves(color)) + len(Шашки.Board().all_moves(color))
+        for kind in Шахматы.piece_classes():
+            if getattr(kind, 'definition', None) is not None:
+                kind.definition.table(color)
+    return count
+
+
+def startup_time(directory, runs):
+    """Функция для замера запуска нового интерпретатора с импортом игр и
+    построением таблиц.
+
+    Args:
+        directory (str): каталог таблиц, '' - без файлов
+        runs (int): кол-во запусков
+
+    Returns:
+        float: лучшее время запуска в миллисекундах
+    """
+
+    env = dict(os.environ, CHESS_TABLES_DIR=directory)
+    code = 'import Замер_запуска; Замер_запуска.warm_up()'
+    best = None
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, '-c', code], env=env, check=True,
+                       cwd=os.path.dirname(os.path.abspath(__file__)))
+        elapsed = (time.perf_counter() - started) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def import_time(directory, runs):
+    """Функция для замера времени импорта игр и построения таблиц внутри
+    нового интерпретатора, без времени запуска самого Python.
+
+    Args:
+        directory (str): каталог таблиц, '' - без файлов
+        runs (int): кол-во запусков
+
+    Returns:
+        float: лучшее время в миллисекундах
+    """
+
+    env = dict(os.environ, CHESS_TABLES_DIR=directory)
+    code = ('import time; started = time.perf_counter(); import Замер_запуска; Замер_запуска.warm_up(); '
+            'print((time.perf_counter() - started) * 1000)')
+    times = []
+    for _ in range(runs):
+        result = subprocess.run([sys.executable, '-c', code], env=env, check=True, capture_output=True,
+                                text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+        times.append(float(result.stdout))
+    return min(times)
+
+
+def pool_cold_start(directory, workers):
+    """Функция для замера холодного старта пула процессов: от создания пула
+    до готовности всех процессов после первого обращения к таблицам.
+    Процессы запускаются через spawn, как на Windows и macOS.
+
+    Args:
+        directory (str): каталог таблиц, '' - без файлов
+        workers (int): кол-во процессов
+
+    Returns:
+        float: время в миллисекундах
+    """
+
+    previous = os.environ.get('CHESS_TABLES_DIR')
+    os.environ['CHESS_TABLES_DIR'] = directory
+    try:
+        started = time.perf_counter()
+        with multiprocessing.get_context('spawn').Pool(workers) as pool:
+            pool.map(warm_up, range(workers), chunksize=1)
+            elapsed = (time.perf_counter() - started) * 1000
+        return elapsed
+    finally:
+        if previous is None:
+            del os.environ['CHESS_TABLES_DIR']
+        else:
+            os.environ['CHESS_TABLES_DIR'] = previous
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Замер запуска с таблицами на диске и без них')
+    parser.add_argument('--runs', type=int, default=10, help='кол-во запусков интерпретатора')
+    parser.add_argument('-j', '--workers', type=int, default=os.cpu_count(), help='кол-во процессов пула')
+    parser.add_argument('--clear', action='store_true', help='только удалить файлы таблиц текущей версии')
+    args = parser.parse_args()
+
+    if args.clear:
+        print(f'Удалено файлов таблиц: {Таблицы.clear()}')
+        sys.exit()
+    cache = tempfile.mkdtemp(prefix='tables_')
+    try:
+        subprocess.run([sys.executable, '-c', 'import Замер_запуска; Замер_запуска.warm_up()'],
+                       env=dict(os.environ, CHESS_TABLES_DIR=cache), check=True,
+                       cwd=os.path.dirname(os.path.abspath(__file__)))
+        print('                      без файлов   с файлами')
+        print(f'импорт и таблицы, мс  {import_time("", args.runs):10.1f}  '
+              f'{import_time(cache, args.runs):10.1f}')
+        print(f'запуск Python, мс     {startup_time("", args.runs):10.1f}  '
+              f'{startup_time(cache, args.runs):10.1f}')
+        print(f'пул из {args.workers} процессов, мс'.ljust(22) +
+              f'{pool_cold_start("", args.workers):10.1f}  {pool_cold_start(cache, args.workers):10.1f}')
+    finally:
+        shutil.rmtree(cache)
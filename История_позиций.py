@@ -0,0 +1,107 @@
+class PositionHistory(object):
+    """История позиций партии для правил ничьей.
+
+    Хранит ключи позиций (хеш с учетом очереди хода) в порядке ходов и
+    словарь кол-ва повторений каждого ключа, поэтому проверка повторения
+    стоит O(1). Для каждой позиции также хранится кол-во полуходов без
+    взятия. Ходы можно снимать с конца, например при откате.
+
+    Attributes:
+        repetitions (int): после скольких повторений позиции засчитывается ничья
+        no_progress (int): после скольких полуходов без взятия засчитывается
+        ничья, None - правило выключено
+        keys (list): ключи позиций по порядку
+        quiet (list): кол-во полуходов без взятия для каждой позиции
+        counts (dict): ключ -> сколько раз позиция встречалась
+    """
+
+    def __init__(self, repetitions=3, no_progress=None):
+        """Инициализация истории.
+
+        Args:
+            repetitions (int): после скольких повторений позиции засчитывается ничья
+            no_progress (int): после скольких полуходов без взятия засчитывается ничья
+        """
+
+        self.repetitions = repetitions
+        self.no_progress = no_progress
+        self.keys = []
+        self.quiet = []
+        self.counts = {}
+
+    def copy(self):
+        """Метод для получения независимой копии истории.
+
+        Returns:
+            PositionHistory: копия
+        """
+
+        other = PositionHistory(self.repetitions, self.no_progress)
+        other.keys = list(self.keys)
+        other.quiet = list(self.quiet)
+        other.counts = dict(self.counts)
+        return other
+
+    def push(self, key, progress=False):
+        """Метод для добавления позиции после хода.
+
+        Args:
+            key (int): ключ позиции с учетом очереди хода
+            progress (bool): было ли ходом взятие (сбрасывает счетчик полуходов)
+        """
+
+        self.quiet.append(0 if progress or not self.quiet else self.quiet[-1] + 1)
+        self.keys.append(key)
+        self.counts[key] = self.counts.get(key, 0) + 1
+
+    def pop(self, count=1):
+        """Метод для снятия последних позиций.
+
+        Args:
+            count (int): кол-во снимаемых позиций
+        """
+
+        for _ in range(count):
+            key = self.keys.pop()
+            self.quiet.pop()
+            self.counts[key] -= 1
+            if not self.counts[key]:
+                del self.counts[key]
+
+    def count(self, key):
+        """Метод для получения кол-ва появлений позиции.
+
+        Args:
+            key (int): ключ позиции
+
+        Returns:
+            int: сколько раз позиция встречалась
+        """
+
+        return self.counts.get(key, 0)
+
+    def signature(self):
+        """Метод для получения отпечатка истории для ключей кеша: оценка
+        поиска зависит от того, какие позиции уже встречались и сколько
+        полуходов прошло без взятия.
+
+        Returns:
+            int: отпечаток истории
+        """
+
+        return hash((self.repetitions, self.no_progress, frozenset(self.counts.items()),
+                     self.quiet[-1] if self.quiet else 0))
+
+    def is_draw(self):
+        """Метод для проверки ничьей в последней позиции.
+
+        Returns:
+            bool: истина если позиция повторилась нужное кол-во раз или
+            слишком долго не было взятий
+        """
+
+        if not self.keys:
+            return False
+        if self.counts[self.keys[-1]] >= self.repetitions:
+            return True
+        return self.no_progress is not None and self.quiet[-1] >= self.no_progress
@@ -0,0 +1,148 @@
+import threading
+from collections import OrderedDict
+
+from Движок import Engine
+
+
+class PositionCache(object):
+    """Общий для всего процесса кеш результатов по позиции.
+
+    Хранит списки ходов, подсказки и оценки движка, чтобы разные партии,
+    пришедшие в одну и ту же позицию, не считали их заново. При
+    переполнении удаляется запись, к которой дольше всего не обращались.
+    Все методы можно вызывать из разных потоков.
+
+    Attributes:
+        max_size (int): максимальное кол-во записей
+        data (OrderedDict): ключ -> значение, в порядке последнего обращения
+        lock (threading.Lock): блокировка
+        hits (int): кол-во попаданий
+        misses (int): кол-во промахов
+        evictions (int): кол-во вытесненных записей
+    """
+
+    def __init__(self, max_size=100000):
+        """Инициализация кеша.
+
+        Args:
+            max_size (int): максимальное кол-во записей
+        """
+
+        self.max_size = max_size
+        self.data = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        """Метод для получения значения.
+
+        Args:
+            key: ключ
+            default: значение, если ключа нет
+
+        Returns:
+            значение из кеша либо default
+        """
+
+        with self.lock:
+            if key in self.data:
+                self.data.move_to_end(key)
+                self.hits += 1
+                return self.data[key]
+            self.misses += 1
+            return default
+
+    def put(self, key, value):
+        """Метод для записи значения.
+
+        Args:
+            key: ключ
+            value: значение
+        """
+
+        with self.lock:
+            self.data[key] = value
+            self.data.move_to_end(key)
+            while len(self.data) > self.max_size:
+                self.data.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_compute(self, key, compute):
+        """Метод для получения значения с вычислением при промахе.
+        Вычисление идет без блокировки, поэтому медленный поиск в одном
+        потоке не задерживает остальные.
+
+        Args:
+            key: ключ
+            compute: функция без аргументов, которая вычисляет значение
+
+        Returns:
+            значение; его нельзя изменять, оно общее для всех вызывающих
+        """
+
+        with self.lock:
+            if key in self.data:
+                self.data.move_to_end(key)
+                self.hits += 1
+                return self.data[key]
+            self.misses += 1
+        value = compute()
+        self.put(key, value)
+        return value
+
+    def clear(self):
+        """Метод для очистки кеша и статистики."""
+
+        with self.lock:
+            self.data.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        """Метод для получения статистики.
+
+        Returns:
+            dict: размер, попадания, промахи, вытеснения и доля попаданий
+        """
+
+        with self.lock:
+            total = self.hits + self.misses
+            return {'size': len(self.data), 'hits': self.hits, 'misses': self.misses,
+                    'evictions': self.evictions, 'hit_rate': self.hits / total if total else 0.0}
+
+
+CACHE = PositionCache()
+
+
+def cache_key(board, color, kind, *extra):
+    """Функция для построения ключа кеша. В ключ входят игра, вид
+    результата и хеш позиции с учетом очереди хода.
+
+    Args:
+        board (Board): доска
+        color (str): цвет стороны, которая ходит
+        kind (str): вид результата, например 'moves', 'hint', 'search'
+        *extra: уточнения, например клетка фигуры или глубина поиска
+
+    Returns:
+        tuple: ключ
+    """
+
+    return (type(board).__module__, kind, Engine.position_key(board, color)) + extra
+
+
+def best_move(board, color, depth):
+    """Функция для поиска лучшего хода на заданную глубину с кешем.
+
+    Args:
+        board (Board): доска
+        color (str): цвет стороны, которая ходит
+        depth (int): глубина перебора
+
+    Returns:
+        tuple: лучший ход и его оценка
+    """
+
+    return CACHE.get_or_compute(cache_key(board, color, 'search', depth),
+                                lambda: Engine(max_depth=depth).search(board, color))
@@ -0,0 +1,267 @@
+import argparse
+import copy
+import random
+import statistics
+import threading
+import time
+
+from Движок import Engine
+import Шахматы
+import Шашки
+
+
+class Clock(object):
+    """Шахматные часы с добавлением времени за ход.
+
+    Attributes:
+        remaining (dict): цвет -> оставшееся время в секундах
+        increment (float): добавление за каждый сделанный ход в секундах
+        moves_to_go (int): на сколько ходов вперед делится оставшееся время
+        margin (float): запас на задержки, который не тратится на поиск
+    """
+
+    def __init__(self, seconds, increment=0.0, moves_to_go=30, margin=0.05):
+        """Инициализация часов.
+
+        Args:
+            seconds (float): время на партию для каждой стороны в секундах
+            increment (float): добавление за ход в секундах
+            moves_to_go (int): на сколько ходов вперед делится оставшееся время
+            margin (float): запас на задержки в секундах
+        """
+
+        self.remaining = {'white': float(seconds), 'black': float(seconds)}
+        self.increment = increment
+        self.moves_to_go = moves_to_go
+        self.margin = margin
+
+    def budget(self, color):
+        """Метод для расчета времени на поиск очередного хода.
+
+        Args:
+            color (str): цвет стороны, которая ходит
+
+        Returns:
+            float: время на ход в секундах
+        """
+
+        remaining = self.remaining[color]
+        budget = remaining / self.moves_to_go + self.increment
+        return max(min(budget, remaining / 2 - self.margin), 0.001)
+
+    def press(self, color, elapsed):
+        """Метод для учета сделанного хода.
+
+        Args:
+            color (str): цвет стороны, которая сходила
+            elapsed (float): время, потраченное на ход в секундах
+        """
+
+        self.remaining[color] += self.increment - elapsed
+
+    def flagged(self, color):
+        """Метод для проверки, не вышло ли время у стороны.
+
+        Args:
+            color (str): цвет стороны
+
+        Returns:
+            bool: истина если время вышло
+        """
+
+        return self.remaining[color] < 0
+
+
+class SearchController(object):
+    """Поиск в отдельном потоке, который можно остановить в любой момент.
+
+    Поток ведет итеративное углубление на своей копии доски. После каждой
+    завершенной итерации лучший ход, оценка и главная линия становятся
+    доступны через метод current. Остановка ставит флаг, который движок
+    проверяет в каждом узле, поэтому поток завершается за время обработки
+    одного узла; задержка от запроса остановки до возврата хода
+    записывается.
+
+    Attributes:
+        max_depth (int): максимальная глубина перебора
+        table_size (int): максимальное кол-во записей в таблице транспозиций
+        engine (Engine): движок текущего поиска либо None
+        thread (threading.Thread): поток поиска либо None
+        stop_event (threading.Event): сигнал остановки
+        lock (threading.Lock): блокировка для info
+        info (dict): сведения о последней завершенной итерации
+        latencies (list): задержки остановки в секундах
+    """
+
+    def __init__(self, max_depth=64, table_size=1 << 20):
+        """Инициализация контроллера.
+
+        Args:
+            max_depth (int): максимальная глубина перебора
+            table_size (int): максимальное кол-во записей в таблице транспозиций
+        """
+
+        self.max_depth = max_depth
+        self.table_size = table_size
+        self.engine = None
+        self.thread = None
+        self.stop_event = threading.Event()
+        self.lock = threading.Lock()
+        self.info = {}
+        self.latencies = []
+
+    def start(self, board, color, time_limit=None, clock=None, history=None):
+        """Метод для запуска поиска. Предыдущий поиск останавливается.
+
+        Args:
+            board (Board): доска, поток получает ее копию
+            color (str): цвет стороны, которая ходит
+            time_limit (float): время на поиск в секундах; None - до остановки
+            clock (Clock): часы, по которым считается время на ход, если
+            time_limit не задан
+            history (PositionHistory): история партии для правил ничьей,
+            поток получает ее копию
+        """
+
+        self.stop()
+        if time_limit is None and clock is not None:
+            time_limit = clock.budget(color)
+        board = copy.deepcopy(board)
+        history = history.copy() if history is not None else None
+        moves = board.all_moves(color)
+        with self.lock:
+            self.info = {'depth': 0, 'move': moves[0] if moves else None, 'score': None,
+                         'line': [], 'nodes': 0, 'time': 0.0}
+        self.stop_event = threading.Event()
+        self.engine = Engine(max_depth=self.max_depth, time_limit=time_limit,
+                             table_size=self.table_size, stop_event=self.stop_event)
+        self.thread = threading.Thread(target=self.work, args=(self.engine, board, color, history),
+                                       daemon=True)
+        self.thread.start()
+
+    def work(self, engine, board, color, history):
+        """Метод потока поиска.
+
+        Args:
+            engine (Engine): движок
+            board (Board): копия доски
+            color (str): цвет стороны, которая ходит
+            history (PositionHistory): копия истории партии либо None
+        """
+
+        started = time.perf_counter()
+
+        def publish(depth, move, score):
+            line = engine.principal_variation(board, color)
+            with self.lock:
+                self.info = {'depth': depth, 'move': move, 'score': score,
+                             'line': line if line and line[0] == move else [move],
+                             'nodes': engine.nodes, 'time': time.perf_counter() - started}
+
+        engine.search(board, color, history, publish)
+
+    def current(self):
+        """Метод для получения лучшего найденного на данный момент хода.
+
+        Returns:
+            dict: глубина, ход, оценка, главная линия, кол-во узлов и время
+            последней завершенной итерации
+        """
+
+        with self.lock:
+            return dict(self.info)
+
+    def running(self):
+        """Метод для проверки, идет ли поиск.
+
+        Returns:
+            bool: истина если поток поиска еще работает
+        """
+
+        return self.thread is not None and self.thread.is_alive()
+
+    def wait(self, timeout=None):
+        """Метод для ожидания окончания поиска по времени или глубине.
+
+        Args:
+            timeout (float): максимальное время ожидания в секундах
+
+        Returns:
+            dict: лучший найденный ход, как в current
+        """
+
+        if self.thread is not None:
+            self.thread.join(timeout)
+        return self.current()
+
+    def stop(self):
+        """Метод для остановки поиска. Возвращается после завершения потока.
+
+        Returns:
+            dict: лучший найденный ход, как в current
+        """
+
+        if self.thread is not None:
+            requested = time.perf_counter()
+            alive = self.thread.is_alive()
+            self.stop_event.set()
+            self.thread.join()
+            if alive:
+                self.latencies.append(time.perf_counter() - requested)
+            self.thread = None
+        return self.current()
+
+    def think(self, board, color, clock, history=None):
+        """Метод для хода по часам: поиск в пределах времени на ход и учет
+        потраченного времени.
+
+        Args:
+            board (Board): доска
+            color (str): цвет стороны, которая ходит
+            clock (Clock): часы
+            history (PositionHistory): история партии
+
+        Returns:
+            dict: лучший найденный ход, как в current
+        """
+
+        started = time.perf_counter()
+        self.start(board, color, clock=clock, history=history)
+        self.wait()
+        info = self.stop()
+        clock.press(color, time.perf_counter() - started)
+        return info
+
+
+def measure_latency(board_class, trials=20, seed=0):
+    """Функция для замера задержки от запроса остановки до возврата хода.
+    Поиск без ограничения времени останавливается через случайный промежуток.
+
+    Args:
+        board_class (type): класс доски
+        trials (int): кол-во остановок
+        seed (int): начальное значение генератора случайных чисел
+
+    Returns:
+        dict: средняя, медианная и максимальная задержка в миллисекундах
+    """
+
+    rng = random.Random(seed)
+    controller = SearchController()
+    for _ in range(trials):
+        controller.start(board_class(), 'white')
+        time.sleep(rng.uniform(0.01, 0.2))
+        controller.stop()
+    latencies = [value * 1000 for value in controller.latencies]
+    return {'mean_ms': statistics.mean(latencies), 'median_ms': statistics.median(latencies),
+            'max_ms': max(latencies)}
+
+
+if __name__ == '__main__':
+    boards = {'chess': Шахматы.Board, 'checkers': Шашки.Board}
+    parser = argparse.ArgumentParser(description='Замер задержки остановки поиска')
+    parser.add_argument('game', choices=sorted(boards), help='игра')
+    parser.add_argument('--trials', type=int, default=20, help='кол-во остановок')
+    args = parser.parse_args()
+    for name, value in measure_latency(boards[args.game], args.trials).items():
+        print(f'{name}: {value:.2f}')
@@ -0,0 +1,392 @@
+import argparse
+import math
+import random
+import time
+from array import array
+
+from Движок import Engine, opponent
+
+
+UNEXPANDED = -1
+
+
+class MCTS(object):
+    """Поиск хода методом Монте-Карло по дереву (UCT).
+
+    Работает с любой доской, у которой есть атрибут key и методы all_moves,
+    apply_move и undo_move, то есть и с шахматной доской, и с шашечной.
+    Узлы дерева хранятся не объектами, а в плоских массивах фиксированного
+    размера, поэтому память ограничена бюджетом узлов. Случайные партии
+    разыгрываются ходом и отменой хода прямо на доске, без копирования.
+
+    Attributes:
+        capacity (int): максимальное кол-во узлов дерева
+        exploration (float): коэффициент исследования в формуле UCT
+        playout_limit (int): максимальная длина случайной партии в полуходах,
+        после нее партия считается ничьей
+        parent (array): номер родителя каждого узла
+        first_child (array): номер первого потомка, потомки узла лежат подряд
+        child_count (array): кол-во потомков, UNEXPANDED если узел не раскрыт
+        visits (array): кол-во посещений узла
+        wins (array): сумма результатов для стороны, сделавшей ход в узел
+        keys (array): ключ позиции в узле с учетом очереди хода
+        moves (list): ход, ведущий в узел
+        spare (tuple): второй набор массивов того же размера, в который
+        сжимается дерево при переиспользовании, либо None до первого сжатия
+        size (int): кол-во занятых узлов, корень всегда под номером 0
+        playouts (int): кол-во случайных партий в последнем поиске
+        elapsed (float): время последнего поиска в секундах
+    """
+
+    def __init__(self, node_budget=200000, exploration=1.4, playout_limit=200, seed=None):
+        """Инициализация поиска.
+
+        Args:
+            node_budget (int): максимальное кол-во узлов дерева
+            exploration (float): коэффициент исследования в формуле UCT
+            playout_limit (int): максимальная длина случайной партии
+            seed (int): зерно генератора случайных чисел
+        """
+
+        self.capacity = node_budget
+        self.exploration = exploration
+        self.playout_limit = playout_limit
+        self.rng = random.Random(seed)
+        (self.parent, self.first_child, self.child_count, self.visits,
+         self.wins, self.keys, self.moves) = self.allocate(node_budget)
+        self.spare = None
+        self.size = 0
+        self.playouts = 0
+        self.elapsed = 0.0
+
+    def search(self, board, color, playouts=1000, time_limit=None):
+        """Метод для поиска лучшего хода. Если позиция уже есть в дереве
+        от прошлого поиска (тот же корень либо позиция через один-два
+        полухода), накопленная статистика используется повторно.
+
+        Args:
+            board (Board): доска, после поиска она остается в исходном состоянии
+            color (str): цвет стороны, которая ходит
+            playouts (int): кол-во случайных партий
+            time_limit (float): ограничение времени в секундах, если задано,
+            поиск идет до него, а не по кол-ву партий
+
+        Returns:
+            tuple: лучший ход и доля побед после него; ход None, если ходов нет
+
+        Raises:
+            ValueError: если бюджет узлов меньше кол-ва ходов из корня
+        """
+
+        key = Engine.position_key(board, color)
+        self.reuse(key)
+        if self.child_count[0] == UNEXPANDED and not self.expand(0, board, color):
+            self.reset(key)
+            if not self.expand(0, board, color):
+                raise ValueError(f'Бюджет узлов {self.capacity} меньше кол-ва ходов из корня')
+        started = time.perf_counter()
+        deadline = started + time_limit if time_limit else None
+        self.playouts = 0
+        while True:
+            if deadline:
+                if time.perf_counter() > deadline:
+                    break
+            elif self.playouts >= playouts:
+                break
+            self.playout(board, color)
+            self.playouts += 1
+        self.elapsed = time.perf_counter() - started
+        return self.best_move()
+
+    @staticmethod
+    def allocate(capacity):
+        """Метод для создания набора массивов узлов.
+
+        Args:
+            capacity (int): кол-во узлов
+
+        Returns:
+            tuple: массивы parent, first_child, child_count, visits, wins,
+            keys и список moves
+        """
+
+        return (array('i', [0]) * capacity, array('i', [0]) * capacity,
+                array('i', [UNEXPANDED]) * capacity, array('i', [0]) * capacity,
+                array('d', [0.0]) * capacity, array('Q', [0]) * capacity, [None] * capacity)
+
+    def best_move(self):
+        """Метод для выбора самого посещаемого хода из корня.
+
+        Returns:
+            tuple: ход и доля побед после него; ход None, если ходов нет
+        """
+
+        best, best_visits = None, -1
+        first = self.first_child[0]
+        for child in range(first, first + max(self.child_count[0], 0)):
+            if self.visits[child] > best_visits:
+                best, best_visits = child, self.visits[child]
+        if best is None:
+            return None, 0.0
+        return self.moves[best], self.wins[best] / best_visits if best_visits else 0.0
+
+    def playout(self, board, color):
+        """Метод для одной итерации: выбор узла по UCT, раскрытие,
+        случайная партия и обновление статистики.
+
+        Args:
+            board (Board): доска
+            color (str): цвет стороны, которая ходит в корне
+        """
+
+        node = 0
+        side = color
+        undos = []
+        while self.child_count[node] > 0:
+            node = self.select(node)
+            undos.append(board.apply_move(self.moves[node]))
+            side = opponent(side)
+            self.keys[node] = Engine.position_key(board, side)
+
+        if self.child_count[node] == UNEXPANDED:
+            if self.expand(node, board, side) and self.child_count[node]:
+                node = self.first_child[node] + self.rng.randrange(self.child_count[node])
+                undos.append(board.apply_move(self.moves[node]))
+                side = opponent(side)
+                self.keys[node] = Engine.position_key(board, side)
+
+        winner = self.rollout(board, side)
+        for undo in reversed(undos):
+            board.undo_move(undo)
+
+        mover = opponent(side)
+        while True:
+            self.visits[node] += 1
+            if winner is None:
+                self.wins[node] += 0.5
+            elif winner == mover:
+                self.wins[node] += 1.0
+            if node == 0:
+                break
+            node = self.parent[node]
+            mover = opponent(mover)
+
+    def expand(self, node, board, side):
+        """Метод для раскрытия узла: потомки для всех ходов занимают
+        следующие свободные узлы подряд.
+
+        Args:
+            node (int): номер узла
+            board (Board): доска в позиции узла
+            side (str): цвет стороны, которая ходит
+
+        Returns:
+            bool: истина если узел раскрыт (в том числе без ходов), ложь
+            если для потомков не хватает бюджета узлов
+        """
+
+        moves = board.all_moves(side)
+        if not moves:
+            self.child_count[node] = 0
+            return True
+        if self.size + len(moves) > self.capacity:
+            return False
+        first = self.size
+        for indx, move in enumerate(moves):
+            child = first + indx
+            self.parent[child] = node
+            self.child_count[child] = UNEXPANDED
+            self.visits[child] = 0
+            self.wins[child] = 0.0
+            self.moves[child] = move
+        self.first_child[node] = first
+        self.child_count[node] = len(moves)
+        self.size += len(moves)
+        return True
+
+    def select(self, node):
+        """Метод для выбора потомка по формуле UCT.
+
+        Args:
+            node (int): номер узла
+
+        Returns:
+            int: номер выбранного потомка
+        """
+
+        first = self.first_child[node]
+        log_visits = math.log(self.visits[node] or 1)
+        best, best_value = first, -1.0
+        for child in range(first, first + self.child_count[node]):
+            visits = self.visits[child]
+            if not visits:
+                return child
+            value = (self.wins[child] / visits +
+                     self.exploration * math.sqrt(log_visits / visits))
+            if value > best_value:
+                best, best_value = child, value
+        return best
+
+    def rollout(self, board, side):
+        """Метод для случайной партии из текущей позиции. Доска
+        возвращается в исходное состояние.
+
+        Args:
+            board (Board): доска
+            side (str): цвет стороны, которая ходит
+
+        Returns:
+            str: цвет победителя либо None при ничьей по длине партии
+        """
+
+        undos = []
+        winner = None
+        for _ in range(self.playout_limit):
+            moves = board.all_moves(side)
+            if not moves:
+                winner = opponent(side)
+                break
+            undos.append(board.apply_move(self.rng.choice(moves)))
+            side = opponent(side)
+        for undo in reversed(undos):
+            board.undo_move(undo)
+        return winner
+
+    def reuse(self, key):
+        """Метод для переиспользования дерева прошлого поиска. Корень
+        переносится на узел с той же позицией среди потомков и внуков
+        корня, поддерево сжимается в начало массивов, остальное
+        освобождается. Если позиции в дереве нет, дерево строится заново.
+
+        Args:
+            key (int): ключ позиции с учетом очереди хода
+        """
+
+        if self.size and self.keys[0] == key:
+            return
+        found = None
+        if self.size:
+            first = self.first_child[0]
+            for child in range(first, first + max(self.child_count[0], 0)):
+                if self.visits[child] and self.keys[child] == key:
+                    found = child
+                    break
+                grand_first = self.first_child[child]
+                for grandchild in range(grand_first, grand_first + max(self.child_count[child], 0)):
+                    if self.visits[grandchild] and self.keys[grandchild] == key:
+                        found = grandchild
+                        break
+                if found is not None:
+                    break
+        if found is None:
+            self.reset(key)
+        else:
+            self.compact(found)
+
+    def reset(self, key):
+        """Метод для начала нового дерева из одного корня.
+
+        Args:
+            key (int): ключ позиции с учетом очереди хода
+        """
+
+        self.size = 1
+        self.parent[0] = 0
+        self.child_count[0] = UNEXPANDED
+        self.visits[0] = 0
+        self.wins[0] = 0.0
+        self.keys[0] = key
+        self.moves[0] = None
+
+    def compact(self, root):
+        """Метод для переноса поддерева в начало второго набора массивов
+        обходом в ширину, после чего наборы меняются местами. Сжать дерево
+        на месте нельзя: в порядке обхода узел может получить номер больше
+        старого и затереть еще не перенесенный узел. Второй набор создается
+        один раз, ячейки за пределами дерева перезаписываются при раскрытии.
+
+        Args:
+            root (int): номер нового корня
+        """
+
+        if self.spare is None:
+            self.spare = self.allocate(self.capacity)
+        parent, first_child, child_count, visits, wins, keys, moves = self.spare
+
+        queue = [(root, 0, 0)]
+        size = 1
+        for old, new, new_parent in queue:
+            parent[new] = new_parent
+            visits[new] = self.visits[old]
+            wins[new] = self.wins[old]
+            keys[new] = self.keys[old]
+            moves[new] = self.moves[old]
+            count = self.child_count[old]
+            child_count[new] = count
+            if count > 0:
+                first_child[new] = size
+                old_first = self.first_child[old]
+                for indx in range(count):
+                    queue.append((old_first + indx, size + indx, new))
+                size += count
+
+        moves[0] = None
+        self.spare = (self.parent, self.first_child, self.child_count, self.visits,
+                      self.wins, self.keys, self.moves)
+        self.parent, self.first_child, self.child_count = parent, first_child, child_count
+        self.visits, self.wins, self.keys, self.moves = visits, wins, keys, moves
+        self.size = size
+
+    def playouts_per_second(self):
+        """Метод для получения скорости последнего поиска.
+
+        Returns:
+            float: кол-во случайных партий в секунду
+        """
+
+        return self.playouts / self.elapsed if self.elapsed else 0.0
+
+    def report(self):
+        """Метод для получения отчета о последнем поиске.
+
+        Returns:
+            str: кол-во партий, скорость и занятость дерева
+        """
+
+        return (f'Партий: {self.playouts}, {self.playouts_per_second():.0f} партий/с, '
+                f'узлов: {self.size} из {self.capacity}')
+
+
+if __name__ == '__main__':
+    import Шахматы
+    import Шашки
+
+    boards = {'chess': Шахматы.Board, 'checkers': Шашки.Board}
+    parser = argparse.ArgumentParser(description='Партия поиска Монте-Карло с самим собой и замер партий/с')
+    parser.add_argument('game', choices=sorted(boards), help='игра')
+    parser.add_argument('--moves', type=int, default=10, help='кол-во полуходов')
+    parser.add_argument('--playouts', type=int, default=1000, help='кол-во случайных партий на ход')
+    parser.add_argument('--time', type=float, default=None, help='время на ход в секундах вместо кол-ва партий')
+    parser.add_argument('--budget', type=int, default=200000, help='максимальное кол-во узлов дерева')
+    parser.add_argument('--seed', type=int, default=0, help='зерно генератора случайных чисел')
+    args = parser.parse_args()
+
+    board, color = boards[args.game](), 'white'
+    mcts = MCTS(node_budget=args.budget, seed=args.seed)
+    total_playouts, total_time = 0, 0.0
+    for ply in range(args.moves):
+        try:
+            move, rate = mcts.search(board, color, args.playouts, args.time)
+        except ValueError as error:
+            parser.error(str(error))
+        if move is None:
+            print('Ходов нет')
+            break
+        total_playouts += mcts.playouts
+        total_time += mcts.elapsed
+        text = '-'.join(Шашки.Game.format_position(square) for square in move[:2])
+        print(f'{ply + 1}. {text} (доля побед {rate:.2f}) {mcts.report()}')
+        board.apply_move(move)
+        color = opponent(color)
+    if total_time:
+        print(f'Итого: {total_playouts} партий, {total_playouts / total_time:.0f} партий/с')
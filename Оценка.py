@@ -0,0 +1,99 @@
+class Evaluation(object):
+    """Оценка позиции, которая обновляется при каждой смене фигуры на клетке.
+
+    Доска вызывает add и remove из своего метода установки фигуры, поэтому
+    суммы материала, позиционных бонусов и кол-ва фигур всегда совпадают
+    с полем, а оценка позиции считается за O(1) без обхода доски.
+
+    Attributes:
+        bonuses (dict): класс фигуры -> таблица 8x8 позиционных бонусов
+        для белых (для черных таблица отражается по строкам)
+        material (dict): цвет -> сумма ценностей фигур
+        positional (dict): цвет -> сумма позиционных бонусов
+        counts (dict): символ фигуры -> кол-во таких фигур на доске
+    """
+
+    def __init__(self, bonuses):
+        """Инициализация оценки пустой доски.
+
+        Args:
+            bonuses (dict): класс фигуры -> таблица 8x8 позиционных бонусов для белых
+        """
+
+        self.bonuses = bonuses
+        self.material = {'white': 0, 'black': 0}
+        self.positional = {'white': 0, 'black': 0}
+        self.counts = {}
+
+    def __deepcopy__(self, memo):
+        """Метод для копирования оценки вместе с доской. Таблицы бонусов
+        не меняются, поэтому они общие у всех копий.
+
+        Args:
+            memo (dict): словарь уже скопированных объектов
+
+        Returns:
+            Evaluation: копия оценки
+        """
+
+        other = Evaluation(self.bonuses)
+        other.material = dict(self.material)
+        other.positional = dict(self.positional)
+        other.counts = dict(self.counts)
+        return other
+
+    def bonus(self, piece, position):
+        """Метод для получения позиционного бонуса фигуры на клетке.
+
+        Args:
+            piece: фигура
+            position (tuple): координаты клетки
+
+        Returns:
+            int: бонус
+        """
+
+        table = self.bonuses.get(type(piece))
+        if table is None:
+            return 0
+        string, col = position
+        return table[string if piece.color == 'white' else 7 - string][col]
+
+    def add(self, piece, position):
+        """Метод для учета фигуры, поставленной на клетку.
+
+        Args:
+            piece: фигура
+            position (tuple): координаты клетки
+        """
+
+        symbol = piece.get_symbol()
+        self.material[piece.color] += piece.value
+        self.positional[piece.color] += self.bonus(piece, position)
+        self.counts[symbol] = self.counts.get(symbol, 0) + 1
+
+    def remove(self, piece, position):
+        """Метод для учета фигуры, убранной с клетки.
+
+        Args:
+            piece: фигура
+            position (tuple): координаты клетки
+        """
+
+        self.material[piece.color] -= piece.value
+        self.positional[piece.color] -= self.bonus(piece, position)
+        self.counts[piece.get_symbol()] -= 1
+
+    def score(self, color):
+        """Метод для получения оценки позиции.
+
+        Args:
+            color (str): цвет стороны, с точки зрения которой идет оценка
+
+        Returns:
+            int: разница материала и позиционных бонусов сторон
+        """
+
+        enemy = 'black' if color == 'white' else 'white'
+        return (self.material[color] + self.positional[color] -
+                self.material[enemy] - self.positional[enemy])
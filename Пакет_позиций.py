@@ -0,0 +1,320 @@
+import argparse
+import multiprocessing
+import pickle
+import time
+from multiprocessing import shared_memory
+
+from Движок import opponent
+import Шахматы
+import Шашки
+
+
+class Layout(object):
+    """Описание упакованной записи позиции для одной игры.
+
+    Запись - по байту на клетку (0 - пусто, иначе номер символа фигуры
+    плюс один) и байт очереди хода (0 - белые, 1 - черные).
+
+    Attributes:
+        board_class (type): класс доски
+        squares (list): клетки, которые хранятся в записи
+        symbols (str): символы фигур, код фигуры - номер символа плюс один
+        classes (dict): символ -> (класс фигуры, цвет)
+        codes (dict): символ -> код фигуры
+        record_size (int): размер записи в байтах
+    """
+
+    def __init__(self, board_class, squares, classes):
+        """Инициализация описания.
+
+        Args:
+            board_class (type): класс доски
+            squares (list): клетки, которые хранятся в записи
+            classes (list): классы фигур игры
+        """
+
+        self.board_class = board_class
+        self.squares = squares
+        self.classes = {kind(color).get_symbol(): (kind, color)
+                        for kind in classes for color in ['white', 'black']}
+        self.symbols = ''.join(sorted(self.classes))
+        self.codes = {symbol: indx + 1 for indx, symbol in enumerate(self.symbols)}
+        self.record_size = len(squares) + 1
+
+    def pack_into(self, buffer, offset, board, color):
+        """Метод для записи позиции в буфер.
+
+        Args:
+            buffer: буфер с возможностью записи (bytearray, memoryview)
+            offset (int): смещение записи в байтах
+            board (Board): доска
+            color (str): цвет стороны, которая ходит
+        """
+
+        field = board.field
+        for indx, (string, col) in enumerate(self.squares):
+            piece = field[string][col]
+            buffer[offset + indx] = self.codes[piece.get_symbol()] if piece else 0
+        buffer[offset + len(self.squares)] = 0 if color == 'white' else 1
+
+
+LAYOUTS = {
+    'chess': Layout(Шахматы.Board, [(string, col) for string in range(8) for col in range(8)],
+                    Шахматы.piece_classes()),
+    'checkers': Layout(Шашки.Board, [(string, col) for string in range(8) for col in range(8)
+                                     if (string + col) % 2],
+                       Шашки.Checker.__subclasses__()),
+}
+
+
+class PositionBatch(object):
+    """Пакет позиций в плоском буфере. Клетки читаются прямо из буфера по
+    запросу, объект доски собирается только если он действительно нужен.
+
+    Attributes:
+        game (str): 'chess' или 'checkers'
+        layout (Layout): описание записи
+        buffer (memoryview): буфер с записями
+        count (int): кол-во позиций
+    """
+
+    def __init__(self, game, buffer, count):
+        """Инициализация пакета поверх готового буфера.
+
+        Args:
+            game (str): 'chess' или 'checkers'
+            buffer: буфер с записями (bytes, bytearray, mmap, shared memory)
+            count (int): кол-во позиций
+        """
+
+        self.game = game
+        self.layout = LAYOUTS[game]
+        self.buffer = memoryview(buffer)
+        self.count = count
+
+    @classmethod
+    def pack(cls, game, positions):
+        """Метод для упаковки списка позиций в новый буфер.
+
+        Args:
+            game (str): 'chess' или 'checkers'
+            positions (list): пары (доска, цвет стороны, которая ходит)
+
+        Returns:
+            PositionBatch: пакет позиций
+        """
+
+        layout = LAYOUTS[game]
+        buffer = bytearray(layout.record_size * len(positions))
+        for indx, (board, color) in enumerate(positions):
+            layout.pack_into(buffer, indx * layout.record_size, board, color)
+        return cls(game, buffer, len(positions))
+
+    def __len__(self):
+        """Метод для получения кол-ва позиций.
+
+        Returns:
+            int: кол-во позиций
+        """
+
+        return self.count
+
+    def color(self, index):
+        """Метод для получения очереди хода.
+
+        Args:
+            index (int): номер позиции
+
+        Returns:
+            str: цвет стороны, которая ходит
+        """
+
+        offset = (index + 1) * self.layout.record_size - 1
+        return 'black' if self.buffer[offset] else 'white'
+
+    def symbol(self, index, square):
+        """Метод для получения символа фигуры на клетке без сборки доски.
+
+        Args:
+            index (int): номер позиции
+            square (int): номер клетки в записи
+
+        Returns:
+            str: символ фигуры либо None, если клетка пуста
+        """
+
+        code = self.buffer[index * self.layout.record_size + square]
+        return self.layout.symbols[code - 1] if code else None
+
+    def board(self, index):
+        """Метод для сборки объекта доски из записи.
+
+        Args:
+            index (int): номер позиции
+
+        Returns:
+            Board: доска с этой позицией
+        """
+
+        layout = self.layout
+        board = layout.board_class()
+        for color in ['white', 'black']:
+            for position in list(board.pieces[color]):
+                board.set_piece(position, None)
+        with self.buffer[index * layout.record_size:(index + 1) * layout.record_size] as record:
+            for square in range(len(layout.squares)):
+                code = record[square]
+                if code:
+                    kind, color = layout.classes[layout.symbols[code - 1]]
+                    board.set_piece(layout.squares[square], kind(color))
+        return board
+
+    def copy_to_shared_memory(self):
+        """Метод для копирования пакета в разделяемую память.
+
+        Returns:
+            SharedMemory: блок разделяемой памяти, его нужно закрыть и
+            освободить (close и unlink) после работы
+        """
+
+        size = max(len(self.buffer), 1)
+        memory = shared_memory.SharedMemory(create=True, size=size)
+        memory.buf[:len(self.buffer)] = self.buffer
+        return memory
+
+
+def _run_slice(task):
+    """Функция для обработки части пакета в процессе пула. Процесс
+    подключается к разделяемой памяти по имени, позиции не копируются.
+
+    Args:
+        task (tuple): имя блока памяти, игра, кол-во позиций, функция,
+        начало и конец отрезка
+
+    Returns:
+        list: результаты функции для каждой позиции отрезка
+    """
+
+    name, game, count, func, start, stop = task
+    memory = shared_memory.SharedMemory(name=name)
+    batch = None
+    try:
+        batch = PositionBatch(game, memory.buf, count)
+        return [func(batch, index) for index in range(start, stop)]
+    finally:
+        if batch is not None:
+            batch.buffer.release()
+        memory.close()
+
+
+def map_shared(func, batch, workers=None, chunk_size=256):
+    """Функция для обработки пакета позиций пулом процессов через
+    разделяемую память. Процессам передаются только имя блока и границы
+    отрезка.
+
+    Args:
+        func: функция верхнего уровня модуля func(batch, index)
+        batch (PositionBatch): пакет позиций
+        workers (int): кол-во процессов
+        chunk_size (int): кол-во позиций в одной задаче
+
+    Returns:
+        list: результаты в порядке позиций
+    """
+
+    memory = batch.copy_to_shared_memory()
+    try:
+        tasks = [(memory.name, batch.game, batch.count, func, start, min(start + chunk_size, batch.count))
+                 for start in range(0, batch.count, chunk_size)]
+        results = []
+        with multiprocessing.Pool(workers) as pool:
+            for part in pool.map(_run_slice, tasks):
+                results.extend(part)
+        return results
+    finally:
+        memory.close()
+        memory.unlink()
+
+
+def count_pieces(batch, index):
+    """Функция для примера и замера: кол-во фигур в позиции, считается
+    прямо по буферу.
+
+    Args:
+        batch (PositionBatch): пакет позиций
+        index (int): номер позиции
+
+    Returns:
+        int: кол-во фигур
+    """
+
+    return sum(1 for square in range(len(batch.layout.squares)) if batch.symbol(index, square))
+
+
+def _count_pieces_board(board):
+    """Функция для замера: кол-во фигур на присланной целиком доске.
+
+    Args:
+        board (Board): доска
+
+    Returns:
+        int: кол-во фигур
+    """
+
+    return len(board.pieces['white']) + len(board.pieces['black'])
+
+
+def benchmark(game, count, workers):
+    """Функция для сравнения передачи позиций процессам: pickle объектов
+    Board против пакета в разделяемой памяти.
+
+    Args:
+        game (str): 'chess' или 'checkers'
+        count (int): кол-во позиций
+        workers (int): кол-во процессов
+
+    Returns:
+        dict: время на позицию в микросекундах для каждого способа
+    """
+
+    board = LAYOUTS[game].board_class()
+    positions = []
+    color = 'white'
+    for indx in range(count):
+        moves = board.all_moves(color)
+        if not moves:
+            board = LAYOUTS[game].board_class()
+            color = 'white'
+            moves = board.all_moves(color)
+        board.apply_move(moves[indx % len(moves)])
+        color = opponent(color)
+        positions.append((LAYOUTS[game].board_class.from_text(board.to_text()), color))
+
+    result = {}
+    started = time.perf_counter()
+    for board, _ in positions:
+        pickle.loads(pickle.dumps(board))
+    result['pickle_roundtrip_us'] = (time.perf_counter() - started) / count * 1e6
+
+    started = time.perf_counter()
+    batch = PositionBatch.pack(game, positions)
+    result['pack_us'] = (time.perf_counter() - started) / count * 1e6
+
+    started = time.perf_counter()
+    with multiprocessing.Pool(workers) as pool:
+        pool.map(_count_pieces_board, [board for board, _ in positions], chunksize=256)
+    result['pool_pickled_boards_us'] = (time.perf_counter() - started) / count * 1e6
+    started = time.perf_counter()
+    map_shared(count_pieces, batch, workers)
+    result['pool_shared_batch_us'] = (time.perf_counter() - started) / count * 1e6
+    return result
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Замер передачи позиций процессам')
+    parser.add_argument('game', choices=sorted(LAYOUTS), help='игра')
+    parser.add_argument('--count', type=int, default=20000, help='кол-во позиций')
+    parser.add_argument('-j', '--workers', type=int, default=None, help='кол-во процессов')
+    args = parser.parse_args()
+    for name, value in benchmark(args.game, args.count, args.workers).items():
+        print(f'{name}: {value:.2f} мкс/позиция')
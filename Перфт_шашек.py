@@ -0,0 +1,109 @@
+import argparse
+import sys
+import time
+
+from Движок import opponent
+from Шашки import Board, Game
+
+
+START = Board().to_text()
+MIDDLE = '.n...n../......n./...n.n../..N...../......../..q...Q./.N...N.N/N...N...'
+
+REFERENCE = {
+    (START, 'white'): [7, 49, 369, 2675, 20979, 158637],
+    (MIDDLE, 'white'): [8, 87, 929, 9972, 111071],
+}
+
+
+def perft(board, color, depth):
+    """Функция для подсчета кол-ва позиций на заданной глубине.
+
+    Args:
+        board (Board): доска, после подсчета она остается в исходном состоянии
+        color (str): цвет стороны, которая ходит
+        depth (int): глубина
+
+    Returns:
+        int: кол-во листьев дерева ходов
+    """
+
+    if depth == 0:
+        return 1
+    moves = board.all_moves(color)
+    if depth == 1:
+        return len(moves)
+    nodes = 0
+    for move in moves:
+        undo = board.apply_move(move)
+        nodes += perft(board, opponent(color), depth - 1)
+        board.undo_move(undo)
+    return nodes
+
+
+def divide(board, color, depth):
+    """Функция для подсчета позиций отдельно для каждого первого хода.
+
+    Args:
+        board (Board): доска
+        color (str): цвет стороны, которая ходит
+        depth (int): глубина, не меньше 1
+
+    Returns:
+        list: пары (ход, кол-во листьев)
+    """
+
+    result = []
+    for move in board.all_moves(color):
+        undo = board.apply_move(move)
+        result.append((move, perft(board, opponent(color), depth - 1)))
+        board.undo_move(undo)
+    return result
+
+
+def check(max_depth=5):
+    """Функция для сверки генератора ходов с эталонными значениями.
+
+    Args:
+        max_depth (int): максимальная проверяемая глубина
+
+    Returns:
+        list: строки с описанием расхождений, пустой список если все совпало
+    """
+
+    errors = []
+    for (text, color), counts in REFERENCE.items():
+        for depth, expected in enumerate(counts[:max_depth], 1):
+            got = perft(Board.from_text(text), color, depth)
+            if got != expected:
+                errors.append(f'{text} {color} глубина {depth}: ожидалось {expected}, получено {got}')
+    return errors
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Подсчет позиций (perft) для шашек')
+    parser.add_argument('depth', type=int, nargs='?', default=5, help='глубина')
+    parser.add_argument('--position', default=START, help='позиция: 8 рядов через "/", пустые клетки - точки')
+    parser.add_argument('--side', default='white', choices=['white', 'black'], help='чей ход')
+    parser.add_argument('--divide', action='store_true', help='вывести кол-во позиций для каждого хода')
+    parser.add_argument('--check', action='store_true', help='сверить с эталонной таблицей')
+    args = parser.parse_args()
+
+    if args.check:
+        errors = check(args.depth)
+        for error in errors:
+            print(error)
+        print('ОШИБКИ В ГЕНЕРАТОРЕ ХОДОВ' if errors else 'Все значения совпали с эталоном')
+        sys.exit(1 if errors else 0)
+
+    board = Board.from_text(args.position)
+    started = time.perf_counter()
+    if args.divide:
+        total = 0
+        for move, nodes in divide(board, args.side, args.depth):
+            print(f'{Game.format_position(move[0])}-{Game.format_position(move[1])}: {nodes}')
+            total += nodes
+    else:
+        total = perft(board, args.side, args.depth)
+    elapsed = time.perf_counter() - started
+    print(f'Глубина {args.depth}: {total} позиций за {elapsed:.3f} с, '
+          f'{total / elapsed if elapsed else 0:.0f} позиций/с')
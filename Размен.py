@@ -0,0 +1,233 @@
+import argparse
+import random
+import time
+
+from Движок import INF, Engine, opponent
+from Шахматы import Board, King, SWAP
+
+
+MAX_EXCHANGE = 32
+PATHS = {}
+
+
+def attack_path(piece, square, target):
+    """Функция для получения клеток, которые должны быть пустыми, чтобы
+    фигура могла взять на целевой клетке. Результат запоминается.
+
+    Args:
+        piece (Piece): фигура
+        square (tuple): клетка фигуры
+        target (tuple): целевая клетка
+
+    Returns:
+        tuple: клетки между фигурой и целью (пустой кортеж для прыжков и
+        соседних клеток) либо None, если фигура не бьет цель
+    """
+
+    key = (type(piece), piece.color, square, target)
+    if key in PATHS:
+        return PATHS[key]
+    definition = getattr(piece, 'definition', None)
+    path = None
+    if definition is None:
+        direction = -1 if piece.color == 'white' else 1
+        if target[0] - square[0] == direction and abs(target[1] - square[1]) == 1:
+            path = ()
+    else:
+        leaps, rays = definition.table(piece.color)[square[0]][square[1]]
+        if target in leaps:
+            path = ()
+        else:
+            for ray in rays:
+                if target in ray:
+                    path = tuple(ray[:ray.index(target)])
+                    break
+    PATHS[key] = path
+    return path
+
+
+def least_valuable_attacker(field, overrides, placed, target):
+    """Функция для поиска самой дешевой фигуры, которая бьет цель. Обмен
+    местами не дает материала, поэтому Changer берется последним.
+
+    Args:
+        field (list): поле доски
+        overrides (dict): клетка -> фигура либо None, изменения поля по
+        ходу размена
+        placed (dict): клетка -> фигура для фигур стороны, еще не
+        участвовавших в размене
+        target (tuple): целевая клетка
+
+    Returns:
+        tuple: клетка и фигура либо None, если бить нечем
+    """
+
+    best, best_order = None, None
+    for square, piece in placed.items():
+        order = (piece.capture == SWAP, piece.value)
+        if best is not None and order >= best_order:
+            continue
+        path = attack_path(piece, square, target)
+        if path is None:
+            continue
+        for pos in path:
+            occupant = overrides[pos] if pos in overrides else field[pos[0]][pos[1]]
+            if occupant:
+                break
+        else:
+            best, best_order = (square, piece), order
+    return best
+
+
+def static_exchange(board, move):
+    """Функция для оценки размена на клетке без выполнения ходов.
+
+    Стороны по очереди бьют на целевой клетке самой дешевой фигурой и
+    могут остановиться, когда продолжение невыгодно. Changer не съедает
+    фигуру, а меняется с ней местами: материал не меняется, на клетке
+    оказывается Changer, а вытесненная фигура встает на его место и может
+    снова участвовать в размене. Фигуры, открывающиеся за ушедшими
+    (рентген), учитываются, так как пути проверяются по текущему полю.
+    Два Changer могут меняться местами бесконечно, поэтому длина размена
+    ограничена MAX_EXCHANGE; такие обмены не меняют материал. Без короля
+    у стороны нет ходов, поэтому взятие короля заканчивает размен.
+
+    Args:
+        board (Board): доска, она не изменяется
+        move (tuple): ход-взятие (откуда, куда)
+
+    Returns:
+        int: итог размена в материале для стороны, которая начала
+    """
+
+    start, end = move
+    field = board.field
+    piece = field[start[0]][start[1]]
+    target = field[end[0]][end[1]]
+    if not target or target.color == piece.color:
+        return 0
+
+    placed = {'white': dict(board.pieces['white']), 'black': dict(board.pieces['black'])}
+    del placed[target.color][end]
+    overrides = {}
+    gains = []
+    on_square = target
+    side, square = piece.color, start
+    while True:
+        del placed[side][square]
+        if piece.capture == SWAP:
+            gains.append(-gains[-1] if gains else 0)
+            placed[on_square.color][square] = on_square
+            overrides[square] = on_square
+        else:
+            gains.append(on_square.value - gains[-1] if gains else on_square.value)
+            overrides[square] = None
+        if type(on_square) == King and piece.capture != SWAP:
+            break
+        on_square = piece
+        overrides[end] = piece
+        side = opponent(side)
+        attacker = least_valuable_attacker(field, overrides, placed[side], end)
+        if attacker is None or len(gains) >= MAX_EXCHANGE:
+            break
+        square, piece = attacker
+
+    for indx in range(len(gains) - 1, 0, -1):
+        gains[indx - 1] = -max(-gains[indx - 1], gains[indx])
+    return gains[0]
+
+
+def exchange_search(board, move, depth=MAX_EXCHANGE):
+    """Функция для той же оценки размена перебором настоящих ходов: после
+    взятия стороны отвечают любыми взятиями на этой клетке либо
+    останавливаются. Медленный эталон для static_exchange.
+
+    Args:
+        board (Board): доска, после вызова она остается в исходном состоянии
+        move (tuple): ход-взятие (откуда, куда)
+        depth (int): максимальная длина размена
+
+    Returns:
+        int: итог размена в материале для стороны, которая начала
+    """
+
+    color = board.get_piece(move[0]).color
+    gain = board.capture_gain(move)
+    undo = board.apply_move(move)
+    try:
+        best = 0
+        if depth > 1:
+            for reply in board.all_moves(opponent(color)):
+                if reply[1] == move[1]:
+                    best = max(best, exchange_search(board, reply, depth - 1))
+        return gain - best
+    finally:
+        board.undo_move(undo)
+
+
+def random_captures(count, seed=0, max_plies=60):
+    """Функция для получения взятий из позиций случайных партий.
+
+    Args:
+        count (int): кол-во взятий
+        seed (int): начальное значение генератора случайных чисел
+        max_plies (int): максимальная длина одной партии
+
+    Returns:
+        list: пары (доска, взятие)
+    """
+
+    rng = random.Random(seed)
+    result = []
+    board, color, plies = Board(), 'white', 0
+    while len(result) < count:
+        moves = board.all_moves(color)
+        if not moves or plies >= max_plies:
+            board, color, plies = Board(), 'white', 0
+            continue
+        captures = [move for move in moves if board.get_piece(move[1])]
+        if captures:
+            result.append((Board.from_text(board.to_text()), rng.choice(captures)))
+        board.apply_move(rng.choice(moves))
+        color = opponent(color)
+        plies += 1
+    return result
+
+
+def benchmark(count=2000):
+    """Функция для сравнения static_exchange с перебором размена и с
+    досчетом взятий движка после того же хода.
+
+    Args:
+        count (int): кол-во взятий
+
+    Returns:
+        dict: время на взятие в микросекундах и доля совпадений с перебором
+    """
+
+    cases = random_captures(count)
+    engine = Engine()
+    result = {}
+    started = time.perf_counter()
+    fast = [static_exchange(board, move) for board, move in cases]
+    result['static_exchange_us'] = (time.perf_counter() - started) / count * 1e6
+    started = time.perf_counter()
+    slow = [exchange_search(board, move) for board, move in cases]
+    result['exchange_search_us'] = (time.perf_counter() - started) / count * 1e6
+    started = time.perf_counter()
+    for board, move in cases:
+        color = board.get_piece(move[0]).color
+        undo = board.apply_move(move)
+        engine.quiescence(board, opponent(color), -INF, INF, 1)
+        board.undo_move(undo)
+    result['quiescence_us'] = (time.perf_counter() - started) / count * 1e6
+    result['agreement'] = sum(1 for a, b in zip(fast, slow) if a == b) / count
+    return result
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Замер оценки разменов (SEE) против перебора')
+    parser.add_argument('--count', type=int, default=2000, help='кол-во взятий')
+    args = parser.parse_args()
+    for name, value in benchmark(args.count).items():
+        print(f'{name}: {value:.3f}')
@@ -0,0 +1,109 @@
+import contextlib
+import glob
+import hashlib
+import mmap
+import os
+import struct
+import threading
+
+
+TABLE_VERSION = 1
+MAGIC = b'TBL1'
+HEADER = struct.Struct('<4sIQ')
+DIRECTORY = os.environ.get('CHESS_TABLES_DIR',
+                           os.path.join(os.environ.get('XDG_CACHE_HOME') or
+                                        os.path.join(os.path.expanduser('~'), '.cache'), 'chess_tables'))
+
+
+def table_name(kind, *params):
+    """Функция для получения имени файла таблицы по ее параметрам, чтобы
+    таблицы с разными параметрами не путались.
+
+    Args:
+        kind (str): вид таблицы, например 'zobrist'
+        *params: параметры, от которых зависит таблица
+
+    Returns:
+        str: имя таблицы
+    """
+
+    digest = hashlib.sha1(repr(params).encode('utf-8')).hexdigest()[:16]
+    return f'{kind}-{digest}'
+
+
+def load_table(name, build, encode, decode):
+    """Функция для получения таблицы: из файла на диске через mmap, а если
+    файла нет, он другой версии или испорчен - построением с записью файла.
+
+    Если каталог недоступен для записи, таблица просто строится в памяти.
+    По умолчанию файлы лежат в пользовательском каталоге кеша, переменная
+    окружения CHESS_TABLES_DIR задает другой каталог, пустая - отключает
+    файлы.
+
+    Args:
+        name (str): имя таблицы
+        build: функция без аргументов, которая строит таблицу
+        encode: функция, которая переводит таблицу в bytes
+        decode: функция, которая строит таблицу по memoryview с данными;
+        она не должна сохранять memoryview и должна бросать ValueError,
+        IndexError или TypeError на испорченных данных
+
+    Returns:
+        таблица
+    """
+
+    if not DIRECTORY:
+        return build()
+    path = os.path.join(DIRECTORY, f'{name}.v{TABLE_VERSION}.bin')
+    try:
+        with open(path, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            magic, version, size = HEADER.unpack_from(data)
+            if magic == MAGIC and version == TABLE_VERSION and size == len(data) - HEADER.size:
+                view = memoryview(data)
+                payload = view[HEADER.size:]
+                try:
+                    return decode(payload)
+                finally:
+                    payload.release()
+                    view.release()
+    except (OSError, ValueError, IndexError, TypeError, struct.error):
+        pass
+
+    table = build()
+    payload = encode(table)
+    temp = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    try:
+        os.makedirs(DIRECTORY, exist_ok=True)
+        with open(temp, 'wb') as file:
+            file.write(HEADER.pack(MAGIC, TABLE_VERSION, len(payload)))
+            file.write(payload)
+        os.replace(temp, path)
+    except OSError:
+        pass
+    finally:
+        with contextlib.suppress(OSError):
+            os.remove(temp)
+    return table
+
+
+def clear():
+    """Функция для удаления файлов таблиц текущей версии. Удаляются только
+    файлы с именами из table_name, остальное содержимое каталога
+    не трогается.
+
+    Returns:
+        int: кол-во удаленных файлов
+    """
+
+    if not DIRECTORY:
+        return 0
+    pattern = f'*-{"[0-9a-f]" * 16}.v{TABLE_VERSION}.bin'
+    paths = glob.glob(os.path.join(glob.escape(DIRECTORY), pattern))
+    paths += glob.glob(os.path.join(glob.escape(DIRECTORY), pattern + '.*.tmp'))
+    removed = 0
+    for path in paths:
+        with contextlib.suppress(OSError):
+            os.remove(path)
+            removed += 1
+    return removed
+
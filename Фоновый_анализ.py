@@ -0,0 +1,154 @@
+import copy
+import threading
+
+from Движок import Engine, opponent
+
+
+class Ponder(object):
+    """Фоновый анализ позиции, пока игрок вводит ход.
+
+    Поток работает на своей копии доски и по очереди считает: все ходы
+    стороны, лучший ход движка, а затем для предсказанного ответа - ходы
+    и лучший ход соперника. Результаты доступны сразу, как только
+    посчитаны. При смене позиции (ход или откат) поток останавливается,
+    но результат для новой позиции, если она была предсказана, остается
+    и не считается заново.
+
+    Attributes:
+        depth (int): глубина перебора движка
+        search (bool): искать ли лучший ход движком; без поиска считаются
+        только ходы текущей позиции
+        key (int): ключ позиции, которая анализируется, либо None
+        results (dict): ключ позиции с учетом очереди хода -> словарь с
+        ключами 'moves' (клетка -> список клеток, куда можно сходить),
+        'best' (лучший ход и оценка) и 'depth' (глубина, на которую
+        посчитан лучший ход)
+        thread (threading.Thread): рабочий поток либо None
+        stop_event (threading.Event): сигнал остановки рабочего потока
+        lock (threading.Lock): блокировка для results
+    """
+
+    def __init__(self, depth=4, search=True):
+        """Инициализация фонового анализа.
+
+        Args:
+            depth (int): глубина перебора движка
+            search (bool): искать ли лучший ход движком
+        """
+
+        self.depth = depth
+        self.search = search
+        self.key = None
+        self.results = {}
+        self.thread = None
+        self.stop_event = threading.Event()
+        self.lock = threading.Lock()
+
+    def start(self, board, color, history=None):
+        """Метод для запуска анализа новой позиции. Предыдущий анализ
+        останавливается. Если эта позиция уже анализируется или
+        проанализирована (например, после недопустимого хода или
+        подсказки), анализ продолжается без перезапуска.
+
+        Args:
+            board (Board): доска, поток получает ее копию
+            color (str): цвет стороны, которая ходит
+            history (PositionHistory): история партии для правил ничьей,
+            поток получает ее копию
+        """
+
+        key = Engine.position_key(board, color)
+        if self.thread is not None and key == self.key:
+            return
+        self.cancel()
+        self.key = key
+        with self.lock:
+            kept = self.results.get(key)
+            self.results = {key: kept} if kept is not None else {}
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self.work,
+                                       args=(copy.deepcopy(board), color,
+                                             history.copy() if history is not None else None,
+                                             self.stop_event),
+                                       daemon=True)
+        self.thread.start()
+
+    def cancel(self):
+        """Метод для остановки анализа. Возвращается после завершения потока."""
+
+        if self.thread is not None:
+            self.stop_event.set()
+            self.thread.join()
+            self.thread = None
+
+    def get(self, board, color):
+        """Метод для получения уже посчитанных результатов по позиции.
+
+        Args:
+            board (Board): доска
+            color (str): цвет стороны, которая ходит
+
+        Returns:
+            dict: результаты анализа либо None, если позиция еще не посчитана
+        """
+
+        with self.lock:
+            return self.results.get(Engine.position_key(board, color))
+
+    def work(self, board, color, history, stop_event):
+        """Метод рабочего потока.
+
+        Args:
+            board (Board): копия доски
+            color (str): цвет стороны, которая ходит
+            history (PositionHistory): копия истории партии либо None
+            stop_event (threading.Event): сигнал остановки
+        """
+
+        move = self.analyse(board, color, history, stop_event)
+        if move is None or stop_event.is_set():
+            return
+        progress = board.capture_gain(move) > 0
+        undo = board.apply_move(move)
+        if history is not None:
+            history.push(Engine.position_key(board, opponent(color)), progress)
+        self.analyse(board, opponent(color), history, stop_event)
+        board.undo_move(undo)
+
+    def analyse(self, board, color, history, stop_event):
+        """Метод для анализа одной позиции.
+
+        Args:
+            board (Board): доска
+            color (str): цвет стороны, которая ходит
+            history (PositionHistory): история партии до этой позиции
+            включительно либо None
+            stop_event (threading.Event): сигнал остановки
+
+        Returns:
+            tuple: лучший ход либо None, если анализ прерван или ходов нет
+        """
+
+        key = Engine.position_key(board, color)
+        with self.lock:
+            result = self.results.get(key)
+        if result is not None and result.get('depth', 0) >= self.depth:
+            return result['best'][0]
+        if result is None:
+            moves = {}
+            for move in board.all_moves(color):
+                moves.setdefault(move[0], []).append(move[1])
+            result = {'moves': moves}
+            with self.lock:
+                self.results[key] = result
+        if stop_event.is_set() or not self.search:
+            return None
+
+        engine = Engine(max_depth=self.depth, stop_event=stop_event)
+        best = engine.search(board, color, history)
+        if stop_event.is_set():
+            return None
+        with self.lock:
+            result['best'] = best
+            result['depth'] = engine.depth_times[-1][0] if engine.depth_times else 0
+        return best[0]
@@ -0,0 +1,419 @@
+import argparse
+import glob
+import json
+import os
+import pickle
+import random
+import shutil
+import struct
+import tempfile
+import threading
+import time
+import zlib
+
+import Шахматы
+import Шашки
+
+
+GAMES = [('chess', Шахматы.Game), ('checkers', Шашки.Game)]
+OPEN, MOVE, ROLLBACK, CLOSE = range(4)
+RECORD = struct.Struct('<IBBBBB')
+CRC = struct.Struct('<I')
+RECORD_SIZE = RECORD.size + CRC.size
+
+
+class SessionStore(object):
+    """Хранилище партий в журнале, в который только дописываются записи.
+
+    Каждое открытие партии, принятый ход, откат и закрытие партии
+    записываются в журнал записью фиксированного размера с контрольной
+    суммой. Записи копятся в памяти, а на диск сбрасываются пачкой с
+    одним fsync раз в sync_interval секунд (групповая фиксация), поэтому
+    после сбоя могут пропасть только ходы за последний интервал. Снимок
+    хранит для каждой партии ходы от начала (с учетом откатов) и
+    начинает новый журнал. При открытии хранилище загружает последний
+    снимок и проигрывает журнал через Game.make_move и Game.rollback.
+
+    Attributes:
+        directory (str): каталог с журналами и снимками
+        sync_interval (float): интервал групповой фиксации в секундах
+        snapshot_every (int): после скольких записей журнала делать снимок
+        games (dict): номер партии -> объект Game
+        lines (dict): номер партии -> (название игры, список ходов от начала)
+        next_id (int): номер следующей партии
+        generation (int): номер текущего журнала и последнего снимка
+        pending (bytearray): записи, еще не сброшенные на диск
+        records (int): кол-во записей в текущем журнале
+        bytes_written (int): кол-во байт, записанных в журналы
+        snapshot_bytes (int): кол-во байт, записанных в снимки
+        syncs (int): кол-во вызовов fsync
+        lock (threading.Lock): блокировка
+    """
+
+    def __init__(self, directory, sync_interval=0.05, snapshot_every=1000000):
+        """Инициализация хранилища с восстановлением партий.
+
+        Args:
+            directory (str): каталог с журналами и снимками
+            sync_interval (float): интервал групповой фиксации в секундах,
+            0 - фиксировать только при вызове sync
+            snapshot_every (int): после скольких записей журнала делать снимок
+        """
+
+        self.directory = directory
+        self.sync_interval = sync_interval
+        self.snapshot_every = snapshot_every
+        self.games = {}
+        self.lines = {}
+        self.next_id = 0
+        self.generation = 0
+        self.pending = bytearray()
+        self.records = 0
+        self.bytes_written = 0
+        self.snapshot_bytes = 0
+        self.syncs = 0
+        self.lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self.recover()
+        self.log = open(self.log_path(self.generation), 'ab')
+        self.stopped = threading.Event()
+        self.flusher = None
+        if sync_interval:
+            self.flusher = threading.Thread(target=self.flush_loop, daemon=True)
+            self.flusher.start()
+
+    def log_path(self, generation):
+        """Метод для получения пути к журналу.
+
+        Args:
+            generation (int): номер журнала
+
+        Returns:
+            str: путь к файлу
+        """
+
+        return os.path.join(self.directory, f'log_{generation:06d}.bin')
+
+    def snapshot_path(self, generation):
+        """Метод для получения пути к снимку.
+
+        Args:
+            generation (int): номер снимка
+
+        Returns:
+            str: путь к файлу
+        """
+
+        return os.path.join(self.directory, f'snapshot_{generation:06d}.json')
+
+    def recover(self):
+        """Метод для восстановления партий из последнего снимка и журнала.
+        Недописанная из-за сбоя запись в конце журнала отбрасывается.
+        """
+
+        snapshots = sorted(glob.glob(os.path.join(self.directory, 'snapshot_*.json')))
+        if snapshots:
+            with open(snapshots[-1], encoding='utf-8') as file:
+                snapshot = json.load(file)
+            self.generation = snapshot['generation']
+            self.next_id = snapshot['next_id']
+            for session, (game, moves) in snapshot['sessions'].items():
+                session = int(session)
+                self.open_game(session, game)
+                for start_str, start_col, end_str, end_col in moves:
+                    self.apply_move(session, (start_str, start_col), (end_str, end_col))
+
+        path = self.log_path(self.generation)
+        if not os.path.exists(path):
+            return
+        with open(path, 'rb') as file:
+            data = file.read()
+        valid = 0
+        for offset in range(0, len(data) - RECORD_SIZE + 1, RECORD_SIZE):
+            body = data[offset:offset + RECORD.size]
+            if CRC.unpack_from(data, offset + RECORD.size)[0] != zlib.crc32(body):
+                break
+            self.replay(*RECORD.unpack(body))
+            valid = offset + RECORD_SIZE
+        self.records = valid // RECORD_SIZE
+        if valid != len(data):
+            with open(path, 'r+b') as file:
+                file.truncate(valid)
+
+    def replay(self, session, op, a, b, c, d):
+        """Метод для применения одной записи журнала.
+
+        Args:
+            session (int): номер партии
+            op (int): OPEN, MOVE, ROLLBACK или CLOSE
+            a, b, c, d (int): данные записи
+        """
+
+        if op == OPEN:
+            self.open_game(session, GAMES[a][0])
+            self.next_id = max(self.next_id, session + 1)
+        elif op == MOVE:
+            self.apply_move(session, (a, b), (c, d))
+        elif op == ROLLBACK:
+            self.apply_rollback(session, a | b << 8)
+        elif op == CLOSE:
+            del self.games[session]
+            del self.lines[session]
+
+    def open_game(self, session, game):
+        """Метод для создания партии в памяти.
+
+        Args:
+            session (int): номер партии
+            game (str): 'chess' или 'checkers'
+        """
+
+        self.games[session] = dict(GAMES)[game]()
+        self.lines[session] = (game, [])
+
+    def apply_move(self, session, start, end):
+        """Метод для хода в партии в памяти так же, как в Game.play.
+
+        Args:
+            session (int): номер партии
+            start (tuple): координаты откуда сходить
+            end (tuple): координаты куда сходить
+
+        Returns:
+            bool: истина если ход принят
+        """
+
+        game = self.games[session]
+        if not game.make_move(start, end):
+            return False
+        game.move_count += 1
+        game.player = 'black' if game.player == 'white' else 'white'
+        self.lines[session][1].append(start + end)
+        return True
+
+    def apply_rollback(self, session, num):
+        """Метод для отката партии в памяти.
+
+        Args:
+            session (int): номер партии
+            num (int): кол-во ходов
+        """
+
+        self.games[session].rollback(num)
+        del self.lines[session][1][len(self.lines[session][1]) - num:]
+
+    def append(self, session, op, a=0, b=0, c=0, d=0):
+        """Метод для добавления записи в журнал. Запись попадает на диск
+        при ближайшей групповой фиксации.
+
+        Args:
+            session (int): номер партии
+            op (int): OPEN, MOVE, ROLLBACK или CLOSE
+            a, b, c, d (int): данные записи
+        """
+
+        body = RECORD.pack(session, op, a, b, c, d)
+        self.pending += body
+        self.pending += CRC.pack(zlib.crc32(body))
+        self.records += 1
+        if self.records >= self.snapshot_every:
+            self.write_snapshot()
+
+    def create(self, game):
+        """Метод для создания новой партии.
+
+        Args:
+            game (str): 'chess' или 'checkers'
+
+        Returns:
+            int: номер партии
+        """
+
+        with self.lock:
+            session = self.next_id
+            self.next_id += 1
+            self.open_game(session, game)
+            self.append(session, OPEN, [name for name, _ in GAMES].index(game))
+            return session
+
+    def make_move(self, session, start, end):
+        """Метод для хода в партии. В журнал попадают только принятые ходы.
+
+        Args:
+            session (int): номер партии
+            start (tuple): координаты откуда сходить
+            end (tuple): координаты куда сходить
+
+        Returns:
+            bool: истина если ход принят
+        """
+
+        with self.lock:
+            if not self.apply_move(session, start, end):
+                return False
+            self.append(session, MOVE, *start, *end)
+            return True
+
+    def rollback(self, session, num):
+        """Метод для отката партии на несколько ходов.
+
+        Args:
+            session (int): номер партии
+            num (int): кол-во ходов
+
+        Raises:
+            ValueError: если ходов меньше num или игра не поддерживает откат
+        """
+
+        with self.lock:
+            game = self.games[session]
+            if not hasattr(game, 'rollback') or not 0 < num <= game.move_count:
+                raise ValueError(f'Нельзя откатить партию {session} на {num} ходов')
+            self.apply_rollback(session, num)
+            self.append(session, ROLLBACK, num & 0xff, num >> 8)
+
+    def close(self, session):
+        """Метод для закрытия партии.
+
+        Args:
+            session (int): номер партии
+        """
+
+        with self.lock:
+            del self.games[session]
+            del self.lines[session]
+            self.append(session, CLOSE)
+
+    def sync(self):
+        """Метод для сброса накопленных записей на диск одним fsync."""
+
+        with self.lock:
+            self.write_pending()
+
+    def write_pending(self):
+        """Метод для записи накопленных записей и fsync, вызывается под
+        блокировкой."""
+
+        if not self.pending:
+            return
+        self.log.write(self.pending)
+        self.log.flush()
+        os.fsync(self.log.fileno())
+        self.bytes_written += len(self.pending)
+        self.syncs += 1
+        self.pending = bytearray()
+
+    def flush_loop(self):
+        """Метод потока групповой фиксации."""
+
+        while not self.stopped.wait(self.sync_interval):
+            self.sync()
+
+    def write_snapshot(self):
+        """Метод для записи снимка и перехода на новый журнал, вызывается
+        под блокировкой. Старые журнал и снимок удаляются после того, как
+        новый снимок записан целиком.
+        """
+
+        self.write_pending()
+        generation = self.generation + 1
+        snapshot = {'generation': generation, 'next_id': self.next_id,
+                    'sessions': {str(session): line for session, line in self.lines.items()}}
+        path = self.snapshot_path(generation)
+        with open(path + '.tmp', 'w', encoding='utf-8') as file:
+            json.dump(snapshot, file, separators=(',', ':'))
+            file.flush()
+            os.fsync(file.fileno())
+            self.snapshot_bytes += file.tell()
+        os.replace(path + '.tmp', path)
+        self.log.close()
+        self.log = open(self.log_path(generation), 'ab')
+        for old in [self.log_path(self.generation), self.snapshot_path(self.generation)]:
+            if os.path.exists(old):
+                os.remove(old)
+        self.generation = generation
+        self.records = 0
+
+    def snapshot(self):
+        """Метод для записи снимка по запросу."""
+
+        with self.lock:
+            self.write_snapshot()
+
+    def shutdown(self):
+        """Метод для остановки хранилища с сохранением всех записей."""
+
+        self.stopped.set()
+        if self.flusher is not None:
+            self.flusher.join()
+        with self.lock:
+            self.write_pending()
+            self.log.close()
+
+
+def benchmark(sessions, moves, game='checkers', seed=0):
+    """Функция для замера записи и восстановления.
+
+    Создается sessions партий по moves случайных ходов, затем хранилище
+    открывается заново. Для сравнения считается размер pickle доски,
+    которую пришлось бы сохранять после каждого хода без журнала.
+
+    Args:
+        sessions (int): кол-во партий
+        moves (int): кол-во ходов в каждой партии
+        game (str): 'chess' или 'checkers'
+        seed (int): начальное значение генератора случайных чисел
+
+    Returns:
+        dict: результаты замера
+    """
+
+    rng = random.Random(seed)
+    directory = tempfile.mkdtemp(prefix='sessions_')
+    try:
+        store = SessionStore(directory)
+        started = time.perf_counter()
+        total_moves = 0
+        pickled = 0
+        for _ in range(sessions):
+            session = store.create(game)
+            for _ in range(moves):
+                board = store.games[session].board
+                color = store.games[session].player
+                legal = board.all_moves(color)
+                if not legal:
+                    break
+                move = rng.choice(legal)
+                store.make_move(session, move[0], move[1])
+                total_moves += 1
+            pickled += len(pickle.dumps(store.games[session].board))
+        store.shutdown()
+        write_time = time.perf_counter() - started
+
+        started = time.perf_counter()
+        recovered = SessionStore(directory, sync_interval=0)
+        recovery_time = time.perf_counter() - started
+        assert len(recovered.games) == sessions
+        recovered.shutdown()
+        return {
+            'moves': total_moves,
+            'log_bytes_per_move': store.bytes_written / total_moves,
+            'snapshot_bytes_per_move': store.snapshot_bytes / total_moves,
+            'pickle_bytes_per_move': pickled / sessions,
+            'syncs': store.syncs,
+            'write_s': write_time,
+            'recovery_s': recovery_time,
+            'recovery_us_per_move': recovery_time / total_moves * 1e6,
+        }
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Замер журнала партий: запись и восстановление')
+    parser.add_argument('--sessions', type=int, default=100000, help='кол-во партий')
+    parser.add_argument('--moves', type=int, default=10, help='кол-во ходов в партии')
+    parser.add_argument('--game', choices=[name for name, _ in GAMES], default='checkers', help='игра')
+    args = parser.parse_args()
+    for name, value in benchmark(args.sessions, args.moves, args.game).items():
+        print(f'{name}: {value:.2f}' if isinstance(value, float) else f'{name}: {value}')
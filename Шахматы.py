@@ -1,5 +1,20 @@
 import re
 import copy
+import argparse
+
+from Движок import Engine, make_zobrist, opponent
+from Фоновый_анализ import Ponder
+from Монте_Карло import MCTS
+from Оценка import Evaluation
+from История_позиций import PositionHistory
+from Таблицы import load_table, table_name
+from Кеш_позиций import CACHE, cache_key
+
+
+ZOBRIST = make_zobrist('PRBKNQSHCprbknqshc', 1917)
+
+NORMAL = 'normal'
+SWAP = 'swap'
 
 
 class Piece(object):
@@ -7,8 +22,11 @@ class Piece(object):
 
     Attributes:
         color: строка для определения цвета фигуры
+        capture (str): способ взятия, NORMAL - фигура съедает вражескую
     """
 
+    capture = NORMAL
+
     def __init__(self, color):
         """Инициализация класса
 
@@ -44,8 +62,11 @@ class Pawn(Piece):
 
     Attributes:
         color: строка для определения цвета фигуры
+        value (int): ценность фигуры для оценки позиции
     """
 
+    value = 100
+
     def get_symbol(self):
         """Метод, который нужен для
         того, чтобы получить символ, которым обозначается фигура.
@@ -94,83 +115,177 @@ class Pawn(Piece):
         return moves
 
 
-class Rook(Piece):
-    """Дочерний класс класса Piece для ладьи.
+ORTHOGONAL = [(1, 0), (-1, 0), (0, 1), (0, -1)]
+DIAGONAL = [(1, 1), (1, -1), (-1, 1), (-1, -1)]
+
+
+class PieceDefinition(object):
+    """Класс для описания правил хода фигуры вместо ручного кода.
+
+    Фигура задается смещениями прыжков (ход ровно на смещение, через
+    фигуры), направлениями скольжения (ход на любое кол-во клеток до
+    первой фигуры) и способом взятия. Смещения записываются для белых,
+    для фигур с направлением вперед у черных меняется знак строки.
+    При первом обращении правила переводятся в таблицы ходов для каждой
+    клетки, поэтому новые фигуры получают быструю генерацию ходов.
+    Таблицы хранятся в файлах, следующие запуски их только читают.
 
     Attributes:
-        color (str): цвет фигуры
+        leapers (list): смещения прыжков (строка, столбец)
+        riders (list): направления скольжения (строка, столбец)
+        forward (bool): зависят ли смещения от цвета фигуры
+        capture (str): NORMAL - фигура съедает вражескую, SWAP - меняется с ней местами
+        tables (dict): цвет -> таблица 8x8, в каждой клетке пара
+        (список клеток для прыжков, список лучей скольжения)
     """
 
-    def get_symbol(self):
-        """Метод для получения символа фигуры.
+    def __init__(self, leapers=(), riders=(), forward=False, capture=NORMAL):
+        """Инициализация описания.
+
+        Args:
+            leapers (list): смещения прыжков
+            riders (list): направления скольжения
+            forward (bool): зависят ли смещения от цвета фигуры
+            capture (str): способ взятия
+        """
+
+        self.leapers = list(leapers)
+        self.riders = list(riders)
+        self.forward = forward
+        self.capture = capture
+        self.tables = {}
+
+    def table(self, color):
+        """Метод для получения таблицы ходов для цвета.
+
+        Args:
+            color (str): цвет фигуры
 
         Returns:
-            str: символ фигуры
+            list: таблица 8x8 с прыжками и лучами для каждой клетки
         """
 
-        return 'R' if self.color == 'white' else 'r'
+        if color not in self.tables:
+            name = table_name('moves', self.leapers, self.riders, self.forward, color)
+            self.tables[color] = load_table(name, lambda: self.compile(color), self.encode, self.decode)
+        return self.tables[color]
 
-    def get_possible_moves(self, board, position):
-        """Метод для получения всех возможных ходов фигуры.
+    def compile(self, color):
+        """Метод для построения таблицы ходов.
 
         Args:
-            board (Board): объект класса доска
-            position (tuple): позиция фигуры
+            color (str): цвет фигуры
 
         Returns:
-            list: список всех возможных ходов
+            list: таблица 8x8 с прыжками и лучами для каждой клетки
         """
 
-        moves = []
-        string, col = position
+        sign = -1 if self.forward and color == 'black' else 1
+        table = []
+        for string in range(8):
+            row = []
+            for col in range(8):
+                leaps = []
+                for dir_str, dir_col in self.leapers:
+                    new_pos = (string + sign * dir_str, col + dir_col)
+                    if Board.is_valid_position(new_pos):
+                        leaps.append(new_pos)
+                rays = []
+                for dir_str, dir_col in self.riders:
+                    ray = []
+                    new_pos = (string + sign * dir_str, col + dir_col)
+                    while Board.is_valid_position(new_pos):
+                        ray.append(new_pos)
+                        new_pos = (new_pos[0] + sign * dir_str, new_pos[1] + dir_col)
+                    if ray:
+                        rays.append(ray)
+                row.append((leaps, rays))
+            table.append(row)
+        return table
 
-        for direction in [el for el in range(-8, 9) if el != 0]:
-            for dir_x in [direction, 0]:
-                for dir_y in [direction, 0]:
-                    if dir_x != dir_y:
-                        new_pos = (string + dir_x, col + dir_y)
-                        if board.is_valid_position(new_pos):
-                            arg = 0
-                            if direction > 0:
-                                start = 1
-                                end = direction
-                            else:
-                                start = direction + 1
-                                end = 0
-                            for el in range(start, end):
-                                el_x = 0 if dir_x == 0 else el
-                                el_y = 0 if dir_y == 0 else el
-                                if board.get_piece((string + el_x, col + el_y)):
-                                    arg += 1
-                                    break
-
-                            if arg == 0:
-                                if board.get_piece(new_pos):
-                                    if board.get_piece(new_pos).color != self.color:
-                                        moves.append(new_pos)
-                                else:
-                                    moves.append(new_pos)
-        return moves
 
+    @staticmethod
+    def encode(table):
+        """Метод для перевода таблицы ходов в байты: для каждой клетки
+        кол-во прыжков, их клетки, кол-во лучей и для каждого луча длина и
+        клетки. Клетка записывается байтом string * 8 + col.
 
-class Bishop(Piece):
-    """Дочерний класс класса Piece для слона.
+        Args:
+            table (list): таблица 8x8 с прыжками и лучами для каждой клетки
+
+        Returns:
+            bytes: данные таблицы
+        """
+
+        data = bytearray()
+        for row in table:
+            for leaps, rays in row:
+                data.append(len(leaps))
+                data.extend(string * 8 + col for string, col in leaps)
+                data.append(len(rays))
+                for ray in rays:
+                    data.append(len(ray))
+                    data.extend(string * 8 + col for string, col in ray)
+        return bytes(data)
+
+    @staticmethod
+    def decode(data):
+        """Метод для построения таблицы ходов по байтам из encode.
+
+        Args:
+            data (memoryview): данные таблицы
+
+        Returns:
+            list: таблица 8x8 с прыжками и лучами для каждой клетки
+
+        Raises:
+            ValueError: если данные короче или длиннее таблицы
+            IndexError: если в данных клетка вне доски
+        """
+
+        data = bytes(data)
+        squares = [(indx // 8, indx % 8) for indx in range(64)]
+        table = []
+        pos = 0
+        for _ in range(8):
+            row = []
+            for _ in range(8):
+                count = data[pos]
+                leaps = [squares[indx] for indx in data[pos + 1:pos + 1 + count]]
+                pos += 1 + count
+                rays = []
+                count = data[pos]
+                pos += 1
+                for _ in range(count):
+                    length = data[pos]
+                    rays.append([squares[indx] for indx in data[pos + 1:pos + 1 + length]])
+                    pos += 1 + length
+                row.append((leaps, rays))
+            table.append(row)
+        if pos != len(data):
+            raise ValueError('Длина данных не совпадает с таблицей ходов')
+        return table
+
+
+class DefinedPiece(Piece):
+    """Класс для фигур, ходы которых задаются описанием PieceDefinition.
+    Дочернему классу достаточно задать definition и get_symbol.
 
     Attributes:
         color (str): цвет фигуры
+        definition (PieceDefinition): правила хода фигуры
     """
 
-    def get_symbol(self):
-        """Метод для получения символа фигуры.
+    definition = None
 
-        Returns:
-            str: символ фигуры
-        """
+    @property
+    def capture(self):
+        """Способ взятия фигуры: NORMAL или SWAP."""
 
-        return 'B' if self.color == 'white' else 'b'
+        return self.definition.capture
 
     def get_possible_moves(self, board, position):
-        """Метод для получения списка всех возможных ходов.
+        """Метод для получения списка всех возможных ходов по таблице.
 
         Args:
             board (Board): шахматная доска
@@ -180,46 +295,36 @@ class Bishop(Piece):
             list: список возможных ходов
         """
 
+        leaps, rays = self.definition.table(self.color)[position[0]][position[1]]
+        field = board.field
         moves = []
-        string, col = position
-
-        for dir in [el for el in range(-8, 9) if el != 0]:
-            if dir > 0:
-                start = 1
-                end = dir
-                step = 1
-            else:
-                start = -1
-                end = dir
-                step = -1
-            for dir_y in [-dir, dir]:
-                new_pos = (string + dir, col + dir_y)
-                if board.is_valid_position(new_pos):
-                    arg = 0
-                    for el in range(start, end, step):
-                        if el > 0:
-                            el_y = el if dir_y > 0 else -el
-                        else:
-                            el_y = -el if dir_y > 0 else el
-                        if board.get_piece((string + el, col + el_y)):
-                            arg += 1
-                            break
-                    if arg == 0:
-                        if board.get_piece(new_pos):
-                            if board.get_piece(new_pos).color != self.color:
-                                moves.append(new_pos)
-                        else:
-                            moves.append(new_pos)
+        for new_pos in leaps:
+            piece = field[new_pos[0]][new_pos[1]]
+            if not piece or piece.color != self.color:
+                moves.append(new_pos)
+        for ray in rays:
+            for new_pos in ray:
+                piece = field[new_pos[0]][new_pos[1]]
+                if piece:
+                    if piece.color != self.color:
+                        moves.append(new_pos)
+                    break
+                moves.append(new_pos)
         return moves
 
 
-class King(Piece):
-    """Дочерний класс класса Piece для короля.
+class Rook(DefinedPiece):
+    """Дочерний класс класса Piece для ладьи.
 
     Attributes:
         color (str): цвет фигуры
+        value (int): ценность фигуры для оценки позиции
+        definition (PieceDefinition): правила хода фигуры
     """
 
+    value = 500
+    definition = PieceDefinition(riders=ORTHOGONAL)
+
     def get_symbol(self):
         """Метод для получения символа фигуры.
 
@@ -227,42 +332,43 @@ class King(Piece):
             str: символ фигуры
         """
 
-        return 'K' if self.color == 'white' else 'k'
+        return 'R' if self.color == 'white' else 'r'
 
-    def get_possible_moves(self, board, position):
-        """Метод для получения списка всех возможных ходов.
 
-        Args:
-            board (Board): шахматная доска
-            position (tuple): координаты фигуры которой ходите
+class Bishop(DefinedPiece):
+    """Дочерний класс класса Piece для слона.
+
+    Attributes:
+        color (str): цвет фигуры
+        value (int): ценность фигуры для оценки позиции
+        definition (PieceDefinition): правила хода фигуры
+    """
+
+    value = 300
+    definition = PieceDefinition(riders=DIAGONAL)
+
+    def get_symbol(self):
+        """Метод для получения символа фигуры.
 
         Returns:
-            list: список возможных ходов
+            str: символ фигуры
         """
 
-        moves = []
-        string, col = position
-
-        for dir_str in [-1, 0, 1]:
-            for dir_col in [-1, 0, 1]:
-                if not (dir_col == 0 and dir_str == 0):
-                    new_pos = (string + dir_str, col + dir_col)
-                    if board.is_valid_position(new_pos):
-                        if board.get_piece(new_pos):
-                            if board.get_piece(new_pos).color != self.color:
-                                moves.append(new_pos)
-                        else:
-                            moves.append(new_pos)
-        return moves
+        return 'B' if self.color == 'white' else 'b'
 
 
-class Knight(Piece):
-    """Дочерний класс класса Piece для коня.
+class King(DefinedPiece):
+    """Дочерний класс класса Piece для короля.
 
     Attributes:
         color (str): цвет фигуры
+        value (int): ценность фигуры для оценки позиции
+        definition (PieceDefinition): правила хода фигуры
     """
 
+    value = 20000
+    definition = PieceDefinition(leapers=ORTHOGONAL + DIAGONAL)
+
     def get_symbol(self):
         """Метод для получения символа фигуры.
 
@@ -270,41 +376,43 @@ class Knight(Piece):
             str: символ фигуры
         """
 
-        return 'N' if self.color == 'white' else 'n'
+        return 'K' if self.color == 'white' else 'k'
 
-    def get_possible_moves(self, board, position):
-        """Метод для получения списка всех возможных ходов.
 
-        Args:
-            board (Board): шахматная доска
-            position (tuple): координаты фигуры которой ходите
+class Knight(DefinedPiece):
+    """Дочерний класс класса Piece для коня.
+
+    Attributes:
+        color (str): цвет фигуры
+        value (int): ценность фигуры для оценки позиции
+        definition (PieceDefinition): правила хода фигуры
+    """
+
+    value = 300
+    definition = PieceDefinition(leapers=[(2, 1), (2, -1), (-2, 1), (-2, -1), (1, 2), (1, -2), (-1, 2), (-1, -2)])
+
+    def get_symbol(self):
+        """Метод для получения символа фигуры.
 
         Returns:
-            list: список возможных ходов
+            str: символ фигуры
         """
 
-        moves = []
-        string, col = position
-        for dir_str in [-2, -1, 1, 2]:
-            for dir_col in [-2, -1, 1, 2]:
-                if abs(dir_str) != abs(dir_col):
-                    new_pos = (string + dir_str, col + dir_col)
-                    if board.is_valid_position(new_pos):
-                        if board.get_piece(new_pos):
-                            if board.get_piece(new_pos).color != self.color:
-                                moves.append(new_pos)
-                        else:
-                            moves.append(new_pos)
-        return moves
+        return 'N' if self.color == 'white' else 'n'
 
 
-class Queen(Piece):
+class Queen(DefinedPiece):
     """Дочерний класс класса Piece для ферзя.
 
     Attributes:
         color (str): цвет фигуры
+        value (int): ценность фигуры для оценки позиции
+        definition (PieceDefinition): правила хода фигуры
     """
 
+    value = 900
+    definition = PieceDefinition(riders=ORTHOGONAL + DIAGONAL)
+
     def get_symbol(self):
         """Метод для получения символа фигуры.
 
@@ -314,85 +422,20 @@ class Queen(Piece):
 
         return 'Q' if self.color == 'white' else 'q'
 
-    def get_possible_moves(self, board, position):
-        """Метод для получения списка всех возможных ходов.
-
-        Args:
-            board (Board): шахматная доска
-            position (tuple): координаты фигуры которой ходите
-
-        Returns:
-            list: список возможных ходов
-        """
-
-        moves = []
-        string, col = position
 
-        for direction in [el for el in range(-8, 9) if el != 0]:
-            for dir_x in [direction, 0]:
-                for dir_y in [direction, 0]:
-                    if dir_x != dir_y:
-                        new_pos = (string + dir_x, col + dir_y)
-                        if board.is_valid_position(new_pos):
-                            arg = 0
-                            if direction > 0:
-                                start = 1
-                                end = direction
-                            else:
-                                start = direction + 1
-                                end = 0
-                            for el in range(start, end):
-                                el_x = 0 if dir_x == 0 else el
-                                el_y = 0 if dir_y == 0 else el
-                                if board.get_piece((string + el_x, col + el_y)):
-                                    arg += 1
-                                    break
-
-                            if arg == 0:
-                                if board.get_piece(new_pos):
-                                    if board.get_piece(new_pos).color != self.color:
-                                        moves.append(new_pos)
-                                else:
-                                    moves.append(new_pos)
-
-        for dir in [el for el in range(-8, 9) if el != 0]:
-            if dir > 0:
-                start = 1
-                end = dir
-                step = 1
-            else:
-                start = -1
-                end = dir
-                step = -1
-            for dir_y in [-dir, dir]:
-                new_pos = (string + dir, col + dir_y)
-                if board.is_valid_position(new_pos):
-                    arg = 0
-                    for el in range(start, end, step):
-                        if el > 0:
-                            el_y = el if dir_y > 0 else -el
-                        else:
-                            el_y = -el if dir_y > 0 else el
-                        if board.get_piece((string + el, col + el_y)):
-                            arg += 1
-                            break
-                    if arg == 0:
-                        if board.get_piece(new_pos):
-                            if board.get_piece(new_pos).color != self.color:
-                                moves.append(new_pos)
-                        else:
-                            moves.append(new_pos)
-        return moves
-
-
-class Soldier(Piece):
+class Soldier(DefinedPiece):
     """Дочерний класс класса Piece для солдата.
      Эта фигура ходит на 2 клетки аперед и может перескакивать другие фигуры.
 
     Attributes:
         color (str): цвет фигуры
+        value (int): ценность фигуры для оценки позиции
+        definition (PieceDefinition): правила хода фигуры
     """
 
+    value = 200
+    definition = PieceDefinition(leapers=[(-2, 0)], forward=True)
+
     def get_symbol(self):
         """Метод для получения символа фигуры.
 
@@ -402,38 +445,20 @@ class Soldier(Piece):
 
         return 'S' if self.color == 'white' else 's'
 
-    def get_possible_moves(self, board, position):
-        """Метод для получения списка всех возможных ходов.
-
-        Args:
-            board (Board): шахматная доска
-            position (tuple): координаты фигуры которой ходите
-
-        Returns:
-            list: список возможных ходов
-        """
-
-        moves = []
-        string, col = position
-        direction = -2 if self.color == 'white' else 2
-        new_pos = (string + direction, col)
-        if board.is_valid_position(new_pos):
-            if board.get_piece(new_pos):
-                if board.get_piece(new_pos).color != self.color:
-                    moves.append(new_pos)
-            else:
-                moves.append(new_pos)
-        return moves
-
 
-class Horse(Piece):
+class Horse(DefinedPiece):
     """Дочерний класс класса Piece для всадника.
      Эта фигура ходит как конь только 2 на 2.
 
     Attributes:
         color (str): цвет фигуры
+        value (int): ценность фигуры для оценки позиции
+        definition (PieceDefinition): правила хода фигуры
     """
 
+    value = 250
+    definition = PieceDefinition(leapers=[(2, 2), (2, -2), (-2, 2), (-2, -2)])
+
     def get_symbol(self):
         """Метод для получения символа фигуры.
 
@@ -443,39 +468,20 @@ class Horse(Piece):
 
         return 'H' if self.color == 'white' else 'h'
 
-    def get_possible_moves(self, board, position):
-        """Метод для получения списка всех возможных ходов.
 
-        Args:
-            board (Board): шахматная доска
-            position (tuple): координаты фигуры которой ходите
-
-        Returns:
-            list: список возможных ходов
-        """
-
-        moves = []
-        string, col = position
-        for dir_str in [-2, 2]:
-            for dir_col in [-2, 2]:
-                new_pos = (string + dir_str, col + dir_col)
-                if board.is_valid_position(new_pos):
-                    if board.get_piece(new_pos):
-                        if board.get_piece(new_pos).color != self.color:
-                            moves.append(new_pos)
-                    else:
-                        moves.append(new_pos)
-        return moves
-
-
-class Changer(Piece):
+class Changer(DefinedPiece):
     """Дочерний класс класса Piece для changer.
      Эта фигура ходит как ладья но не есть вражескую фигуру, а меняется с ней местами.
 
     Attributes:
         color (str): цвет фигуры
+        value (int): ценность фигуры для оценки позиции
+        definition (PieceDefinition): правила хода фигуры
     """
 
+    value = 450
+    definition = PieceDefinition(riders=ORTHOGONAL, capture=SWAP)
+
     def get_symbol(self):
         """Метод для получения символа фигуры.
 
@@ -485,47 +491,33 @@ class Changer(Piece):
 
         return 'C' if self.color == 'white' else 'c'
 
-    def get_possible_moves(self, board, position):
-        """Метод для получения списка всех возможных ходов.
 
-        Args:
-            board (Board): шахматная доска
-            position (tuple): координаты фигуры которой ходите
+CENTER = [[int(14 - 4 * (abs(3.5 - string) + abs(3.5 - col))) for col in range(8)]
+          for string in range(8)]
+PIECE_SQUARE = {
+    Pawn: [[max(0, 6 - string) * 5] * 8 for string in range(8)],
+    Knight: CENTER,
+    Bishop: CENTER,
+    Horse: CENTER,
+}
 
-        Returns:
-            list: список возможных ходов
-        """
 
-        moves = []
-        string, col = position
+def piece_classes(base=Piece):
+    """Функция для получения всех классов фигур, включая вложенные иерархии.
 
-        for direction in [el for el in range(-8, 9) if el != 0]:
-            for dir_x in [direction, 0]:
-                for dir_y in [direction, 0]:
-                    if dir_x != dir_y:
-                        new_pos = (string + dir_x, col + dir_y)
-                        if board.is_valid_position(new_pos):
-                            arg = 0
-                            if direction > 0:
-                                start = 1
-                                end = direction
-                            else:
-                                start = direction + 1
-                                end = 0
-                            for el in range(start, end):
-                                el_x = 0 if dir_x == 0 else el
-                                el_y = 0 if dir_y == 0 else el
-                                if board.get_piece((string + el_x, col + el_y)):
-                                    arg += 1
-                                    break
-
-                            if arg == 0:
-                                if board.get_piece(new_pos):
-                                    if board.get_piece(new_pos).color != self.color:
-                                        moves.append(new_pos)
-                                else:
-                                    moves.append(new_pos)
-        return moves
+    Args:
+        base (type): класс, потомки которого ищутся
+
+    Returns:
+        list: классы фигур, у которых можно создать объект
+    """
+
+    result = []
+    for kind in base.__subclasses__():
+        if kind is not DefinedPiece:
+            result.append(kind)
+        result.extend(piece_classes(kind))
+    return result
 
 
 class Board(object):
@@ -533,50 +525,57 @@ class Board(object):
 
     Attributes:
         field (lst): представление поля в котором вложены списки с рядами доски
+        key (int): хеш позиции по Зобристу, обновляется при каждой смене фигуры на клетке
+        evaluation (Evaluation): оценка позиции, обновляется вместе с полем
+        pieces (dict): цвет -> словарь клетка -> фигура, чтобы не обходить
+        все 64 клетки, когда нужны фигуры одной стороны
     """
 
     def __init__(self):
         """Инициализация шахматной доски."""
 
         self.field = [[None for _ in range(8)] for _ in range(8)]
+        self.key = 0
+        self.evaluation = Evaluation(PIECE_SQUARE)
+        self.pieces = {'white': {}, 'black': {}}
         self.setup_pieces()
 
     def setup_pieces(self):
         """Метод для расстановки фигур на поле."""
 
         for indx in range(8):
-            self.field[1][indx] = Pawn('black')
-            self.field[6][indx] = Pawn('white')
+            self.set_piece((1, indx), Pawn('black'))
+            self.set_piece((6, indx), Pawn('white'))
 
-        self.field[0][0] = Rook('black')
-        self.field[0][7] = Rook('black')
-        self.field[7][0] = Rook('white')
-        self.field[7][7] = Rook('white')
+        self.set_piece((0, 0), Rook('black'))
+        self.set_piece((0, 7), Rook('black'))
+        self.set_piece((7, 0), Rook('white'))
+        self.set_piece((7, 7), Rook('white'))
 
-        self.field[7][2] = Bishop('white')
-        self.field[7][5] = Bishop('white')
-        self.field[0][2] = Bishop('black')
-        self.field[0][5] = Bishop('black')
+        self.set_piece((7, 2), Bishop('white'))
+        self.set_piece((7, 5), Bishop('white'))
+        self.set_piece((0, 2), Bishop('black'))
+        self.set_piece((0, 5), Bishop('black'))
 
-        self.field[7][4] = King('white')
-        self.field[0][4] = King('black')
+        self.set_piece((7, 4), King('white'))
+        self.set_piece((0, 4), King('black'))
 
-        self.field[7][1] = Knight('white')
-        self.field[7][6] = Knight('white')
-        self.field[0][1] = Knight('black')
-        self.field[0][6] = Knight('black')
+        self.set_piece((7, 1), Knight('white'))
+        self.set_piece((7, 6), Knight('white'))
+        self.set_piece((0, 1), Knight('black'))
+        self.set_piece((0, 6), Knight('black'))
 
-        self.field[7][3] = Queen('white')
-        self.field[0][3] = Queen('black')
+        self.set_piece((7, 3), Queen('white'))
+        self.set_piece((0, 3), Queen('black'))
 
-        self.field[5][1] = Soldier('white')
-        self.field[2][1] = Soldier('black')
+        self.set_piece((5, 1), Soldier('white'))
+        self.set_piece((2, 1), Soldier('black'))
 
-        self.field[5][3] = Horse('white')
-        self.field[2][3] = Horse('black')
+        self.set_piece((5, 3), Horse('white'))
+        self.set_piece((2, 3), Horse('black'))
 
-        self.field[5][5] = Changer('white')
-        self.field[2][5] = Changer('black')
+        self.set_piece((5, 5), Changer('white'))
+        self.set_piece((2, 5), Changer('black'))
 
     def display(self):
         """Метод для вывода поля в консоль."""
@@ -619,6 +618,151 @@ class Board(object):
         string, col = position
         return 0 <= string < 8 and 0 <= col < 8
 
+    @classmethod
+    def from_text(cls, text):
+        """Метод для создания доски из текстовой записи: 8 рядов сверху вниз
+        через '/', пустая клетка обозначается точкой.
+
+        Args:
+            text (str): текстовая запись позиции
+
+        Returns:
+            Board: доска с этой позицией
+
+        Raises:
+            ValueError: если запись некорректна
+        """
+
+        symbols = {kind(color).get_symbol(): (kind, color)
+                   for kind in piece_classes() for color in ['white', 'black']}
+        rows = text.strip().split('/')
+        if len(rows) != 8 or any(len(row) != 8 for row in rows):
+            raise ValueError(f'Некорректная запись позиции: {text}')
+        board = cls()
+        for string, row in enumerate(rows):
+            for col, symbol in enumerate(row):
+                if symbol == '.':
+                    board.set_piece((string, col), None)
+                elif symbol in symbols:
+                    kind, color = symbols[symbol]
+                    board.set_piece((string, col), kind(color))
+                else:
+                    raise ValueError(f'Неизвестная фигура: {symbol}')
+        return board
+
+    def to_text(self):
+        """Метод для получения текстовой записи позиции.
+
+        Returns:
+            str: 8 рядов сверху вниз через '/', пустые клетки - точки
+        """
+
+        return '/'.join(''.join(piece.get_symbol() if piece else '.' for piece in row)
+                        for row in self.field)
+
+    def set_piece(self, position, piece):
+        """Метод для установки фигуры на клетку (или очистки клетки) с
+        обновлением хеша, оценки позиции и списка фигур сторон. Обмен
+        местами у Changer - это две установки, поэтому обновляются обе клетки.
+
+        Args:
+            position (tuple): координаты клетки
+            piece (Piece): фигура либо None
+        """
+
+        string, col = position
+        old = self.field[string][col]
+        if old:
+            self.key ^= ZOBRIST[(old.get_symbol(), string, col)]
+            self.evaluation.remove(old, position)
+            del self.pieces[old.color][position]
+        if piece:
+            self.key ^= ZOBRIST[(piece.get_symbol(), string, col)]
+            self.evaluation.add(piece, position)
+            self.pieces[piece.color][position] = piece
+        self.field[string][col] = piece
+
+    def all_moves(self, color):
+        """Метод для получения всех ходов стороны. Если короля этой стороны
+        уже взяли, партия для нее проиграна и ходов нет.
+
+        Args:
+            color (str): цвет стороны
+
+        Returns:
+            list: список ходов в виде кортежей (откуда, куда)
+        """
+
+        moves = []
+        has_king = False
+        for position, piece in self.pieces[color].items():
+            if type(piece) == King:
+                has_king = True
+            for end in piece.get_possible_moves(self, position):
+                moves.append((position, end))
+        return moves if has_king else []
+
+    def apply_move(self, move):
+        """Метод для выполнения хода без копирования доски. Changer
+        меняется местами с вражеской фигурой, остальные фигуры ее съедают.
+
+        Args:
+            move (tuple): ход (откуда, куда)
+
+        Returns:
+            tuple: информация для отмены хода методом undo_move
+        """
+
+        start, end = move
+        piece = self.field[start[0]][start[1]]
+        target = self.field[end[0]][end[1]]
+        if piece.capture == SWAP:
+            self.set_piece(start, target)
+        else:
+            self.set_piece(start, None)
+        self.set_piece(end, piece)
+        return (move, piece, target)
+
+    def undo_move(self, undo):
+        """Метод для отмены хода, сделанного apply_move.
+
+        Args:
+            undo (tuple): информация, которую вернул apply_move
+        """
+
+        (start, end), piece, target = undo
+        self.set_piece(end, target)
+        self.set_piece(start, piece)
+
+    def capture_gain(self, move):
+        """Метод для оценки выигрыша материала от взятия.
+
+        Args:
+            move (tuple): ход (откуда, куда)
+
+        Returns:
+            int: ценность съеденной фигуры, 0 для тихого хода и обмена местами
+        """
+
+        start, end = move
+        target = self.field[end[0]][end[1]]
+        if not target or self.field[start[0]][start[1]].capture == SWAP:
+            return 0
+        return target.value
+
+    def evaluate(self, color):
+        """Метод для статической оценки позиции: материал и положение фигур.
+        Считается за O(1) по оценке, которая обновляется при каждом ходе.
+
+        Args:
+            color (str): цвет стороны, с точки зрения которой идет оценка
+
+        Returns:
+            int: оценка позиции
+        """
+
+        return self.evaluation.score(color)
+
 
 class Game(object):
     """Класс игры.
@@ -629,14 +773,34 @@ class Game(object):
         move_count (int): счетчик кол-ва ходов
         history (list): список в котором хранятся копии объектов поля
         на каждом из ходов. Необходимо для отката на n ходов
+        ponder (Ponder): фоновый анализ позиции во время ввода либо None
+        positions (PositionHistory): ключи позиций партии для правил ничьей
+        mcts (MCTS): компьютерный соперник за черных либо None
+        playouts (int): кол-во случайных партий на ход компьютера
     """
-    def __init__(self):
-        """Метод для инициализации игры."""
+    def __init__(self, ponder=False, repetitions=3, no_progress=None, mcts=False, playouts=2000):
+        """Метод для инициализации игры.
+
+        Args:
+            ponder (bool): считать ли ходы позиции в фоне, пока игрок вводит ход;
+            поиск движком в шахматах не нужен, его результат нигде не читается
+            repetitions (int): после скольких повторений позиции засчитывается ничья
+            no_progress (int): после скольких полуходов без взятия засчитывается
+            ничья, None - правило выключено
+            mcts (bool): играть ли против компьютера, который ищет ход методом
+            Монте-Карло
+            playouts (int): кол-во случайных партий на ход компьютера
+        """
 
         self.board = Board()
         self.player = 'white'
         self.move_count = 0
         self.history = [copy.deepcopy(self.board)]
+        self.ponder = Ponder(search=False) if ponder else None
+        self.positions = PositionHistory(repetitions, no_progress)
+        self.positions.push(Engine.position_key(self.board, self.player))
+        self.mcts = MCTS() if mcts else None
+        self.playouts = playouts
 
     def play(self):
         """Метод для игры"""
@@ -645,19 +809,21 @@ class Game(object):
             self.board.display()
             print(f"Ход № {self.move_count + 1}\n")
             print(f"ХОД {'БЕЛЫХ' if self.player == 'white' else 'ЧЕРНЫХ'}\n")
+            if self.mcts and self.player == 'black':
+                if not self.computer_move():
+                    return
+                if self.positions.is_draw():
+                    self.board.display()
+                    print('НИЧЬЯ!')
+                    return
+                continue
+            if self.ponder:
+                self.ponder.start(self.board, self.player, self.positions)
             start = self.get_input('Введите координаты фигуры, которой хотите ходить: ')
             self.help_func(start)
             try:
                 if re.fullmatch(r"откат на [0-9]+", start):
-                    num = int(re.search(r"[0-9]+", start).group())
-                    self.move_count -= num
-                    if num % 2:
-                        if self.player == 'black':
-                            self.player = 'white'
-                        else:
-                            self.player = 'black'
-                    self.history = self.history[: - num]
-                    self.board = self.history[-1]
+                    self.rollback(int(re.search(r"[0-9]+", start).group()))
 
             except TypeError:
                 end = self.get_input('Введите координаты, куда хотите ходить. Например, a1: ')
@@ -665,9 +831,66 @@ class Game(object):
                 if self.make_move(start, end):
                     self.move_count += 1
                     self.player = 'black' if self.player == 'white' else 'white'
+                    if self.positions.is_draw():
+                        self.board.display()
+                        print('НИЧЬЯ!')
+                        return
                 else:
                     print('НЕДОПУСТИМЫЙ ХОД, ПОПРОБУЙТЕ СНОВА\n')
 
+    def computer_move(self):
+        """Метод для хода компьютера поиском Монте-Карло. Дерево прошлого
+        поиска используется повторно, если в нем есть текущая позиция.
+
+        Returns:
+            bool: истина если ход сделан, ложь если ходов нет
+        """
+
+        move, rate = self.mcts.search(self.board, self.player, self.playouts)
+        if move is None:
+            print('Ходов нет\n')
+            return False
+        print(f'Ход компьютера: {self.format_position(move[0])}-{self.format_position(move[1])}'
+              f' (доля побед {rate:.2f})')
+        print(self.mcts.report() + '\n')
+        self.make_move(move[0], move[1])
+        self.move_count += 1
+        self.player = 'black' if self.player == 'white' else 'white'
+        return True
+
+    @staticmethod
+    def format_position(position):
+        """Метод для перевода координат в запись вида a1.
+
+        Args:
+            position (tuple): координаты клетки
+
+        Returns:
+            str: клетка в шахматной нотации
+        """
+
+        string, col = position
+        return chr(ord('a') + col) + str(8 - string)
+
+    def rollback(self, num):
+        """Метод для отката на несколько ходов назад.
+
+        Args:
+            num (int): кол-во ходов, не больше сделанных
+        """
+
+        if self.ponder:
+            self.ponder.cancel()
+        self.move_count -= num
+        if num % 2:
+            if self.player == 'black':
+                self.player = 'white'
+            else:
+                self.player = 'black'
+        self.history = self.history[: - num]
+        self.positions.pop(num)
+        self.board = copy.deepcopy(self.history[-1])
+
     def get_input(self, prompt):
         """Метод для получения от пользователя координат на поле.
 
@@ -712,21 +935,42 @@ class Game(object):
         piece = self.board.get_piece(start)
         if not piece or piece.color != self.player:
             return False
-        if end not in piece.get_possible_moves(self.board, start):
+        if end not in self.possible_moves(start):
             return False
-        if type(piece) == Changer:
-            self.board.field[start[0]][start[1]] = self.board.get_piece(end)
-            self.board.field[end[0]][end[1]] = piece
-            self.history.append(copy.deepcopy(self.board))
-            return True
-        else:
-            self.board.field[end[0]][end[1]] = piece
-            self.board.field[start[0]][start[1]] = None
-            self.history.append(copy.deepcopy(self.board))
-            return True
+        if self.ponder:
+            self.ponder.cancel()
+        progress = self.board.capture_gain((start, end)) > 0
+        self.board.apply_move((start, end))
+        self.history.append(copy.deepcopy(self.board))
+        self.positions.push(Engine.position_key(self.board, opponent(self.player)), progress)
+        return True
+
+    def possible_moves(self, start):
+        """Метод для получения клеток, куда может сходить фигура. Если
+        фоновый анализ уже посчитал ходы текущего игрока, они берутся оттуда,
+        иначе из общего кеша позиций. Пустой список ходов из анализа (у
+        стороны без короля нет ходов в all_moves) не используется.
+
+        Args:
+            start (tuple): координаты фигуры
+
+        Returns:
+            list: список клеток
+        """
+
+        piece = self.board.get_piece(start)
+        if not piece:
+            return []
+        if self.ponder and piece.color == self.player:
+            result = self.ponder.get(self.board, self.player)
+            if result is not None and result['moves']:
+                return result['moves'].get(start, [])
+        return CACHE.get_or_compute(cache_key(self.board, self.player, 'moves', start),
+                                    lambda: piece.get_possible_moves(self.board, start))
 
     def help_func(self, start):
         """Метод для подсказки куда можно сходить и какие фигуры можно съесть.
+        Готовая картинка берется из общего кеша позиций.
 
         Args:
             start (tuple): координаты откуда сходить
@@ -734,23 +978,39 @@ class Game(object):
 
         try:
             if self.board.get_piece(start):
-                current_piece = self.board.get_piece(start)
-                print(' ')
-                print("   a b c d e f g h\n")
-                for indx, row in enumerate(self.board.field):
-                    print(8 - indx, end = '  ')
-                    for indx2, piece in enumerate(row):
-                        if (indx, indx2) in current_piece.get_possible_moves(self.board, start):
-                            print(f"\033[91m{piece.get_symbol() if piece else '.'}\033[0m", end = ' ')
-                        else:
-                            print(piece.get_symbol() if piece else '.', end = ' ')
-
-                    print(' ' + str(8 - indx))
-                print("\n   a b c d e f g h\n")
+                print(CACHE.get_or_compute(cache_key(self.board, self.player, 'hint', start),
+                                           lambda: self.render_hint(start)))
         except:
             return
 
+    def render_hint(self, start):
+        """Метод для построения картинки поля с подсвеченными ходами фигуры.
+
+        Args:
+            start (tuple): координаты фигуры
+
+        Returns:
+            str: поле с подсветкой, готовое для вывода
+        """
+
+        possible_moves = self.possible_moves(start)
+        lines = [' ', "   a b c d e f g h\n"]
+        for indx, row in enumerate(self.board.field):
+            line = f'{8 - indx}  '
+            for indx2, piece in enumerate(row):
+                if (indx, indx2) in possible_moves:
+                    line += f"\033[91m{piece.get_symbol() if piece else '.'}\033[0m "
+                else:
+                    line += (piece.get_symbol() if piece else '.') + ' '
+            lines.append(line + ' ' + str(8 - indx))
+        lines.append("\n   a b c d e f g h\n")
+        return '\n'.join(lines)
 
 if __name__ == '__main__':
-    game = Game()
+    parser = argparse.ArgumentParser(description='Шахматы')
+    parser.add_argument('--ponder', action='store_true', help='анализировать позицию в фоне')
+    parser.add_argument('--mcts', action='store_true', help='играть против компьютера за черных')
+    parser.add_argument('--playouts', type=int, default=2000, help='кол-во случайных партий на ход компьютера')
+    args = parser.parse_args()
+    game = Game(ponder=args.ponder, mcts=args.mcts, playouts=args.playouts)
     game.play()
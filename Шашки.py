@@ -1,3 +1,17 @@
+import argparse
+
+from Движок import Engine, make_zobrist, opponent
+from Фоновый_анализ import Ponder
+from Монте_Карло import MCTS
+from Оценка import Evaluation
+from История_позиций import PositionHistory
+from Кеш_позиций import CACHE, cache_key
+
+
+ZOBRIST = make_zobrist('NnQq', 2024)
+HINT_DEPTH = 6
+
+
 class Checker(object):
     """Класс Checker будет являться родительским классов для других классов шашек.
 
@@ -39,8 +53,11 @@ class Normal(Checker):
 
     Attributes:
         color: строка для определения цвета шашки
+        value (int): ценность шашки для оценки позиции
     """
 
+    value = 100
+
     def get_symbol(self):
         """Метод, который нужен для того, чтобы получить символ,
          которым обозначается шашка.
@@ -77,7 +94,8 @@ class Normal(Checker):
             newpos = (string + dir_x, col + dir_y)
             between_x = 1 if dir_x < 0 else -1
             between_y = 1 if dir_y < 0 else -1
-            if (not board.get_checker(newpos) and
+            if (board.is_valid_position(newpos) and
+                not board.get_checker(newpos) and
                 board.get_checker((newpos[0] + between_x, newpos[1] + between_y))):
                 eatable = board.get_checker((newpos[0] + between_x,
                                      newpos[1] + between_y))
@@ -99,8 +117,11 @@ class Queen(Checker):
 
     Attributes:
         color: строка для определения цвета дамки
+        value (int): ценность дамки для оценки позиции
     """
 
+    value = 300
+
     def get_symbol(self):
         """Метод, который нужен для того, чтобы получить символ,
          которым обозначается дамка.
@@ -180,17 +201,27 @@ class Queen(Checker):
             return moves
 
 
+PIECE_SQUARE = {Normal: [[2 * (7 - string)] * 8 for string in range(8)]}
+
+
 class Board(object):
     """Класс шахматной доски.
 
     Attributes:
         field (lst): представление поля в котором вложены списки с рядами доски
+        key (int): хеш позиции по Зобристу, обновляется при каждой смене шашки на клетке
+        evaluation (Evaluation): оценка позиции, обновляется вместе с полем
+        pieces (dict): цвет -> словарь клетка -> шашка, чтобы не обходить
+        все 64 клетки, когда нужны шашки одной стороны
     """
 
     def __init__(self):
         """Инициализация доски"""
         
         self.field = [[None for _ in range(8)] for _ in range(8)]
+        self.key = 0
+        self.evaluation = Evaluation(PIECE_SQUARE)
+        self.pieces = {'white': {}, 'black': {}}
         self.setup_checkers()
 
     def setup_checkers(self):
@@ -198,10 +229,73 @@ class Board(object):
         
         for string in [0, 1, 2]:
             for col in range(1, 8, 2):
-                self.field[string][col - string % 2] = Normal('black')
+                self.set_piece((string, col - string % 2), Normal('black'))
         for string in [5, 6, 7]:
             for col in range(1, 8, 2):
-                self.field[string][col - string % 2] = Normal('white')
+                self.set_piece((string, col - string % 2), Normal('white'))
+
+    @classmethod
+    def from_text(cls, text):
+        """Метод для создания доски из текстовой записи: 8 рядов сверху вниз
+        через '/', пустая клетка обозначается точкой.
+
+        Args:
+            text (str): текстовая запись позиции
+
+        Returns:
+            Board: доска с этой позицией
+
+        Raises:
+            ValueError: если запись некорректна
+        """
+
+        symbols = {kind(color).get_symbol(): (kind, color)
+                   for kind in Checker.__subclasses__() for color in ['white', 'black']}
+        rows = text.strip().split('/')
+        if len(rows) != 8 or any(len(row) != 8 for row in rows):
+            raise ValueError(f'Некорректная запись позиции: {text}')
+        board = cls()
+        for string, row in enumerate(rows):
+            for col, symbol in enumerate(row):
+                if symbol == '.':
+                    board.set_piece((string, col), None)
+                elif symbol in symbols:
+                    kind, color = symbols[symbol]
+                    board.set_piece((string, col), kind(color))
+                else:
+                    raise ValueError(f'Неизвестная шашка: {symbol}')
+        return board
+
+    def to_text(self):
+        """Метод для получения текстовой записи позиции.
+
+        Returns:
+            str: 8 рядов сверху вниз через '/', пустые клетки - точки
+        """
+
+        return '/'.join(''.join(checker.get_symbol() if checker else '.' for checker in row)
+                        for row in self.field)
+
+    def set_piece(self, position, checker):
+        """Метод для установки шашки на клетку (или очистки клетки) с
+        обновлением хеша, оценки позиции и списка шашек сторон.
+
+        Args:
+            position (tuple): координаты клетки
+            checker (Checker): шашка либо None
+        """
+
+        string, col = position
+        old = self.field[string][col]
+        if old:
+            self.key ^= ZOBRIST[(old.get_symbol(), string, col)]
+            self.evaluation.remove(old, position)
+            del self.pieces[old.color][position]
+        if checker:
+            self.key ^= ZOBRIST[(checker.get_symbol(), string, col)]
+            self.evaluation.add(checker, position)
+            self.pieces[checker.color][position] = checker
+        self.field[string][col] = checker
 
     def display(self):
         """Метод для вывода поля в консоль"""
@@ -246,12 +340,105 @@ class Board(object):
     def turning_queen(self):
         """Метод для замены шашаки на дамку при достижении другого конца поля."""
 
-        for indx, row in enumerate(self.field):
-            for indx2, checker in enumerate(row):
-                if indx == 0 and checker == Normal('white'):
-                    self.field[indx][indx2] = Queen('white')
-                if indx == 7 and checker == Normal('black'):
-                    self.field[indx][indx2] = Queen('black')
+        for string, color in [(0, 'white'), (7, 'black')]:
+            for position, checker in list(self.pieces[color].items()):
+                if position[0] == string and type(checker) == Normal:
+                    self.set_piece(position, Queen(color))
+
+    def get_moves(self, position):
+        """Метод для получения ходов шашки в виде кортежей
+        (откуда, куда, съеденные шашки).
+
+        Args:
+            position (tuple): координаты шашки
+
+        Returns:
+            list: список ходов
+        """
+
+        checker = self.get_checker(position)
+        if not checker:
+            return []
+        return [(position, end, tuple(eaten) if eaten else ())
+                for end, eaten in checker.get_possible_moves(self, position)]
+
+    def all_moves(self, color):
+        """Метод для получения всех ходов стороны.
+
+        Args:
+            color (str): цвет стороны
+
+        Returns:
+            list: список ходов в виде кортежей (откуда, куда, съеденные шашки)
+        """
+
+        moves = []
+        for position, checker in self.pieces[color].items():
+            for end, eaten in checker.get_possible_moves(self, position):
+                moves.append((position, end, tuple(eaten) if eaten else ()))
+        return moves
+
+    def apply_move(self, move):
+        """Метод для выполнения хода без копирования доски. Шашка, дошедшая
+        до последней горизонтали, сразу становится дамкой.
+
+        Args:
+            move (tuple): ход (откуда, куда, съеденные шашки)
+
+        Returns:
+            tuple: информация для отмены хода методом undo_move
+        """
+
+        start, end, eaten = move
+        checker = self.field[start[0]][start[1]]
+        removed = [(pos, self.field[pos[0]][pos[1]]) for pos in eaten]
+        for pos, _ in removed:
+            self.set_piece(pos, None)
+        self.set_piece(start, None)
+        if type(checker) == Normal and end[0] == (0 if checker.color == 'white' else 7):
+            self.set_piece(end, Queen(checker.color))
+        else:
+            self.set_piece(end, checker)
+        return (move, checker, removed)
+
+    def undo_move(self, undo):
+        """Метод для отмены хода, сделанного apply_move.
+
+        Args:
+            undo (tuple): информация, которую вернул apply_move
+        """
+
+        (start, end, _), checker, removed = undo
+        self.set_piece(end, None)
+        self.set_piece(start, checker)
+        for pos, eatable in removed:
+            self.set_piece(pos, eatable)
+
+    def capture_gain(self, move):
+        """Метод для оценки выигрыша материала от взятия.
+
+        Args:
+            move (tuple): ход (откуда, куда, съеденные шашки)
+
+        Returns:
+            int: суммарная ценность съеденных шашек, 0 для тихого хода
+        """
+
+        return sum(self.field[pos[0]][pos[1]].value for pos in move[2])
+
+    def evaluate(self, color):
+        """Метод для статической оценки позиции: материал и продвижение
+        простых шашек к дамочному полю. Считается за O(1) по оценке,
+        которая обновляется при каждом ходе.
+
+        Args:
+            color (str): цвет стороны, с точки зрения которой идет оценка
+
+        Returns:
+            int: оценка позиции
+        """
+
+        return self.evaluation.score(color)
 
 class Game(object):
     """Класс игры.
@@ -260,12 +447,32 @@ class Game(object):
         board (Board): шахматная доска
         player (str): цвет игрока который сейчас хходит
         move_count (int): счетчик кол-ва ходов
+        ponder (Ponder): фоновый анализ позиции во время ввода либо None
+        positions (PositionHistory): ключи позиций партии для правил ничьей
+        mcts (MCTS): компьютерный соперник за черных либо None
+        playouts (int): кол-во случайных партий на ход компьютера
     """
-    def __init__(self):
-        """Инициализация игры"""
+    def __init__(self, ponder=False, repetitions=3, no_progress=60, mcts=False, playouts=2000):
+        """Инициализация игры
+
+        Args:
+            ponder (bool): анализировать ли позицию в фоне на глубину подсказки,
+            пока игрок вводит ход
+            repetitions (int): после скольких повторений позиции засчитывается ничья
+            no_progress (int): после скольких полуходов без взятия засчитывается
+            ничья, None - правило выключено
+            mcts (bool): играть ли против компьютера, который ищет ход методом
+            Монте-Карло
+            playouts (int): кол-во случайных партий на ход компьютера
+        """
         self.board = Board()
         self.player = 'white'
         self.move_count = 0
+        self.ponder = Ponder(HINT_DEPTH) if ponder else None
+        self.mcts = MCTS() if mcts else None
+        self.playouts = playouts
+        self.positions = PositionHistory(repetitions, no_progress)
+        self.positions.push(Engine.position_key(self.board, self.player))
 
     def play(self):
         """Метод для игры"""
@@ -273,8 +480,23 @@ class Game(object):
             self.board.display()
             print(f"Ход № {self.move_count + 1}\n")
             print(f"ХОД {'БЕЛЫХ' if self.player == 'white' else 'ЧЕРНЫХ'}\n")
-            start = self.get_input('Введите координаты поля откуда хотите ходить: ')
+            if self.mcts and self.player == 'black':
+                if not self.computer_move():
+                    return
+                self.win()
+                if self.draw():
+                    return
+                continue
+            if self.ponder:
+                self.ponder.start(self.board, self.player, self.positions)
+            start = self.get_input('Введите координаты поля откуда хотите ходить (или "подсказка"): ')
+            if start == 'подсказка':
+                self.hint()
+                continue
             end = self.get_input('Введите координаты поля куда хотите ходить: ')
+            if end == 'подсказка':
+                self.hint()
+                continue
             self.board.turning_queen()
             if self.make_move(start, end):
                 self.move_count += 1
@@ -282,6 +504,8 @@ class Game(object):
             else:
                 print('НЕДОПУСТИМЫЙ ХОД. ПОПРОБУЙТЕ СНОВА!\n')
             self.win()
+            if self.draw():
+                return
 
     def get_input(self, prompt):
         """Метод для получения от пользователя координат на поле.
@@ -290,14 +514,19 @@ class Game(object):
             prompt (str): координаты в строчной виде
 
         Returns:
-            tuple: координаты клетки кортежем
+            tuple or str: координаты клетки кортежем либо команда подсказки
         """
 
         while True:
             position = input(prompt).lower()
-            col = ord(position[0]) - ord('a')
-            row = 8 - int(position[1])
-            return (row, col)
+            if position == 'подсказка':
+                return position
+            try:
+                col = ord(position[0]) - ord('a')
+                row = 8 - int(position[1])
+                return (row, col)
+            except (IndexError, ValueError):
+                print('Некорректно введены координаты, попробуйте снова. Пример правильного ввода: a1\n')
 
     def make_move(self, start, end):
         """Метод для хода.
@@ -311,40 +540,108 @@ class Game(object):
         """
 
         checker = self.board.get_checker(start)
-        pure_moves = []
-        for tup in checker.get_possible_moves(self.board, start):
-            pure_moves.append(tup[0])
         if not checker or checker.color != self.player:
             return False
-        if end not in pure_moves:
+        moves = CACHE.get_or_compute(cache_key(self.board, self.player, 'moves', start),
+                                     lambda: self.board.get_moves(start))
+        for move in moves:
+            if move[1] == end:
+                if self.ponder:
+                    self.ponder.cancel()
+                self.board.apply_move(move)
+                self.positions.push(Engine.position_key(self.board, opponent(self.player)), bool(move[2]))
+                return True
+        return False
+
+    def computer_move(self):
+        """Метод для хода компьютера поиском Монте-Карло. Дерево прошлого
+        поиска используется повторно, если в нем есть текущая позиция.
+
+        Returns:
+            bool: истина если ход сделан, ложь если ходов нет
+        """
+
+        move, rate = self.mcts.search(self.board, self.player, self.playouts)
+        if move is None:
+            print('Ходов нет\n')
             return False
-        for tup in checker.get_possible_moves(self.board, start):
-            if tup[0] == end:
-                if tup[1] is not None:
-                    for el in tup[1]:
-                        self.board.field[el[0]][el[1]] = None
-        self.board.field[end[0]][end[1]] = checker
-        self.board.field[start[0]][start[1]] = None
+        print(f'Ход компьютера: {self.format_position(move[0])}-{self.format_position(move[1])}'
+              f' (доля побед {rate:.2f})')
+        print(self.mcts.report() + '\n')
+        self.make_move(move[0], move[1])
+        self.move_count += 1
+        self.player = 'black' if self.player == 'white' else 'white'
         return True
 
+    def hint(self, depth=HINT_DEPTH):
+        """Метод для подсказки лучшего хода движком. Результат поиска
+        берется из фонового анализа, если он посчитан не меньше чем на
+        нужную глубину, либо из общего кеша позиций.
+
+        Args:
+            depth (int): максимальная глубина перебора
+        """
+
+        result = self.ponder.get(self.board, self.player) if self.ponder else None
+        if result is not None and result.get('depth', 0) >= depth:
+            move, score = result['best']
+            report = 'Посчитано в фоне'
+        else:
+            engine = Engine(max_depth=depth)
+            move, score = CACHE.get_or_compute(
+                cache_key(self.board, self.player, 'search', depth, self.positions.signature()),
+                lambda: engine.search(self.board, self.player, self.positions))
+            report = engine.report() if engine.nodes else 'Взято из кеша'
+        if move is None:
+            print('Ходов нет\n')
+            return
+        print(f'Подсказка: {self.format_position(move[0])}-{self.format_position(move[1])}'
+              f' (оценка {score})')
+        print(report + '\n')
+
+    @staticmethod
+    def format_position(position):
+        """Метод для перевода координат в запись вида a1.
+
+        Args:
+            position (tuple): координаты клетки
+
+        Returns:
+            str: клетка в шахматной нотации
+        """
+
+        string, col = position
+        return chr(ord('a') + col) + str(8 - string)
+
     def win(self):
         """Метод для определения победы."""
 
-        black_count = 0
-        white_count = 0
-        for row in self.board.field:
-            for el in row:
-                if type(el) == Normal or type(el) == Queen:
-                    if el.color == 'black':
-                        black_count += 1
-                    else:
-                        white_count += 1
+        black_count = len(self.board.pieces['black'])
+        white_count = len(self.board.pieces['white'])
         if white_count == 0:
             print('ПОБЕДИЛИ БЕЛЫЕ!')
         if black_count == 0:
             print('ПОБЕДИЛИ ЧЕРНЫЕ!')
 
+    def draw(self):
+        """Метод для определения ничьей по повторению позиции либо по
+        долгой игре без взятий.
+
+        Returns:
+            bool: истина если ничья
+        """
+
+        if self.positions.is_draw():
+            print('НИЧЬЯ!')
+            return True
+        return False
+
 
 if __name__ == '__main__':
-    game = Game()
+    parser = argparse.ArgumentParser(description='Шашки')
+    parser.add_argument('--ponder', action='store_true', help='анализировать позицию в фоне')
+    parser.add_argument('--mcts', action='store_true', help='играть против компьютера за черных')
+    parser.add_argument('--playouts', type=int, default=2000, help='кол-во случайных партий на ход компьютера')
+    args = parser.parse_args()
+    game = Game(ponder=args.ponder, mcts=args.mcts, playouts=args.playouts)
     game.play()
@@ -0,0 +1,278 @@
+import argparse
+import contextlib
+import json
+import os
+import random
+import sys
+import time
+
+try:
+    import numpy as np
+except ImportError as error:
+    raise ImportError('Для экспорта в плоскости нужен NumPy: pip install numpy') from error
+
+from Движок import Engine, opponent
+import Шахматы
+import Шашки
+
+
+GAMES = {
+    'chess': (Шахматы.Game, Шахматы.piece_classes()),
+    'checkers': (Шашки.Game, Шашки.Checker.__subclasses__()),
+}
+RESULTS = {'white': 1, 'black': -1, 'draw': 0}
+
+
+def parse_square(text):
+    """Функция для перевода клетки вида a1 в координаты.
+
+    Args:
+        text (str): клетка в шахматной нотации
+
+    Returns:
+        tuple: координаты клетки
+
+    Raises:
+        ValueError: если запись не является клеткой доски
+    """
+
+    if len(text) != 2 or not 'a' <= text[0] <= 'h' or not '1' <= text[1] <= '8':
+        raise ValueError(f'Некорректная клетка {text!r}')
+    return (8 - int(text[1]), ord(text[0]) - ord('a'))
+
+
+class PlaneWriter(object):
+    """Потоковая запись позиций в файлы .npy частями фиксированного размера.
+
+    Позиция записывается как набор плоскостей 8x8: по одной плоскости на
+    каждый класс фигуры и цвет, 1 - на клетке стоит такая фигура. Метки -
+    очередь хода (0 - белые, 1 - черные), результат партии для стороны,
+    которая ходит (1, 0, -1), и сделанный ход (номера клеток откуда и куда,
+    -1 если хода нет). Буфер части выделяется один раз, поэтому память не
+    зависит от кол-ва партий.
+
+    Attributes:
+        directory (str): каталог для файлов
+        planes (dict): (класс фигуры, цвет) -> номер плоскости
+        chunk_size (int): кол-во позиций в одном файле
+        buffer (numpy.ndarray): плоскости текущей части
+        labels (numpy.ndarray): метки текущей части
+        filled (int): кол-во позиций в текущей части
+        chunks (list): записанные части для индекса
+        total (int): кол-во записанных позиций
+    """
+
+    def __init__(self, directory, classes, chunk_size=65536):
+        """Инициализация записи.
+
+        Args:
+            directory (str): каталог для файлов
+            classes (list): классы фигур игры
+            chunk_size (int): кол-во позиций в одном файле
+        """
+
+        self.directory = directory
+        self.planes = {}
+        for kind in classes:
+            for color in ['white', 'black']:
+                self.planes[(kind, color)] = len(self.planes)
+        self.chunk_size = chunk_size
+        self.buffer = np.zeros((chunk_size, len(self.planes), 8, 8), dtype=np.uint8)
+        self.labels = np.zeros((chunk_size, 4), dtype=np.int8)
+        self.filled = 0
+        self.chunks = []
+        self.total = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def add(self, pieces, color, result, move):
+        """Метод для добавления позиции.
+
+        Args:
+            pieces (dict): цвет -> словарь клетка -> фигура, как Board.pieces
+            color (str): цвет стороны, которая ходит
+            result (int): результат партии для белых (1, 0, -1)
+            move (tuple): сделанный ход (откуда, куда) либо None
+        """
+
+        row = self.filled
+        self.buffer[row] = 0
+        for side in ['white', 'black']:
+            for (string, col), piece in pieces[side].items():
+                self.buffer[row, self.planes[(type(piece), side)], string, col] = 1
+        self.labels[row, 0] = 0 if color == 'white' else 1
+        self.labels[row, 1] = result if color == 'white' else -result
+        if move is None:
+            self.labels[row, 2:] = -1
+        else:
+            self.labels[row, 2] = move[0][0] * 8 + move[0][1]
+            self.labels[row, 3] = move[1][0] * 8 + move[1][1]
+        self.filled += 1
+        if self.filled == self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        """Метод для записи текущей части на диск."""
+
+        if not self.filled:
+            return
+        number = len(self.chunks)
+        planes_name = f'planes_{number:05d}.npy'
+        labels_name = f'labels_{number:05d}.npy'
+        np.save(os.path.join(self.directory, planes_name), self.buffer[:self.filled])
+        np.save(os.path.join(self.directory, labels_name), self.labels[:self.filled])
+        self.chunks.append({'planes': planes_name, 'labels': labels_name, 'count': self.filled})
+        self.total += self.filled
+        self.filled = 0
+        self.write_index()
+
+    def write_index(self):
+        """Метод для записи индекса частей."""
+
+        index = {
+            'planes': [f'{kind.__name__}:{color}' for (kind, color) in self.planes],
+            'labels': ['side', 'result', 'from', 'to'],
+            'total': self.total,
+            'chunks': self.chunks,
+        }
+        path = os.path.join(self.directory, 'index.json')
+        with open(path + '.tmp', 'w', encoding='utf-8') as file:
+            json.dump(index, file, ensure_ascii=False, indent=1)
+        os.replace(path + '.tmp', path)
+
+
+def replay(game_class, moves):
+    """Функция для проигрывания партии через Game.make_move.
+
+    Args:
+        game_class (type): класс игры
+        moves (list): ходы вида 'e2-e4'
+
+    Yields:
+        tuple: доска, цвет стороны, которая ходит, и ход из этой позиции
+
+    Raises:
+        ValueError: если ход недопустим
+    """
+
+    game = game_class()
+    for text in moves:
+        squares = text.split('-')
+        if len(squares) != 2:
+            raise ValueError(f'Некорректная запись хода {text!r}')
+        start, end = (parse_square(square) for square in squares)
+        yield game.board, game.player, (start, end)
+        if not game.make_move(start, end):
+            raise ValueError(f'Недопустимый ход {text}')
+        game.player = opponent(game.player)
+    yield game.board, game.player, None
+
+
+def self_play(game_class, depth, max_plies, rng):
+    """Функция для партии движка с самим собой. Первые ходы случайные,
+    чтобы партии различались.
+
+    Args:
+        game_class (type): класс игры
+        depth (int): глубина перебора
+        max_plies (int): максимальная длина партии, после нее ничья
+        rng (random.Random): генератор случайных чисел
+
+    Returns:
+        tuple: список ходов вида 'e2-e4' и результат ('white', 'black', 'draw');
+        ничья также по правилам игры (повторение позиции, игра без взятий)
+    """
+
+    game = game_class()
+    engine = Engine(max_depth=depth)
+    moves = []
+    for ply in range(max_plies):
+        legal = game.board.all_moves(game.player)
+        if not legal:
+            return moves, opponent(game.player)
+        if ply < 4:
+            move = rng.choice(legal)
+        else:
+            move = engine.search(game.board, game.player, game.positions)[0]
+        text = '-'.join(game.format_position(square) for square in move[:2])
+        game.make_move(move[0], move[1])
+        game.player = opponent(game.player)
+        moves.append(text)
+        if game.positions.is_draw():
+            break
+    return moves, 'draw'
+
+
+def export(game, records, directory, chunk_size=65536):
+    """Функция для экспорта партий в плоскости. Позиции партии сначала
+    собираются целиком и передаются на запись, только если вся партия
+    проиграна без ошибок; партия с некорректной строкой JSON, недопустимым
+    ходом, некорректной клеткой или неизвестным результатом пропускается
+    полностью. Последняя часть и индекс записываются, даже если экспорт
+    прерван.
+
+    Args:
+        game (str): 'chess' или 'checkers'
+        records (iterable): партии - словари с ключами 'moves' и 'result'
+        либо строки JSONL с такими словарями
+        directory (str): каталог для файлов
+        chunk_size (int): кол-во позиций в одном файле
+
+    Returns:
+        tuple: кол-во позиций и время в секундах
+    """
+
+    game_class, classes = GAMES[game]
+    writer = PlaneWriter(directory, classes, chunk_size)
+    started = time.perf_counter()
+    try:
+        for record in records:
+            try:
+                if isinstance(record, str):
+                    record = json.loads(record)
+                if not isinstance(record, dict):
+                    raise ValueError('Партия должна быть словарем')
+                if record.get('result') not in RESULTS:
+                    raise ValueError(f'Неизвестный результат {record.get("result")!r}')
+                moves = record.get('moves')
+                if not isinstance(moves, list) or not all(isinstance(text, str) for text in moves):
+                    raise ValueError('Ходы должны быть списком строк')
+                positions = [({side: dict(board.pieces[side]) for side in ['white', 'black']}, color, move)
+                             for board, color, move in replay(game_class, moves)]
+            except ValueError as error:
+                print(f'Партия пропущена: {error}', file=sys.stderr)
+                continue
+            result = RESULTS[record['result']]
+            for pieces, color, move in positions:
+                writer.add(pieces, color, result, move)
+    finally:
+        writer.flush()
+        writer.write_index()
+    return writer.total, time.perf_counter() - started
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Экспорт позиций в плоскости NumPy для обучения')
+    parser.add_argument('game', choices=sorted(GAMES), help='игра')
+    parser.add_argument('input', nargs='?', default='-',
+                        help='JSONL с партиями {"moves": ["a3-b4", ...], "result": "white|black|draw"}, '
+                             '"-" - stdin')
+    parser.add_argument('-o', '--output', default='planes', help='каталог для файлов')
+    parser.add_argument('--chunk-size', type=int, default=65536, help='позиций в одном файле')
+    parser.add_argument('--self-play', type=int, default=0, help='вместо входа сыграть N партий движком')
+    parser.add_argument('--depth', type=int, default=2, help='глубина перебора для партий движка')
+    parser.add_argument('--max-plies', type=int, default=200, help='максимальная длина партии движка')
+    args = parser.parse_args()
+
+    if args.self_play:
+        rng = random.Random(0)
+        game_class = GAMES[args.game][0]
+        records = ({'moves': moves, 'result': result}
+                   for moves, result in (self_play(game_class, args.depth, args.max_plies, rng)
+                                         for _ in range(args.self_play)))
+        count, elapsed = export(args.game, records, args.output, args.chunk_size)
+    else:
+        with (contextlib.nullcontext(sys.stdin) if args.input == '-'
+              else open(args.input, encoding='utf-8')) as source:
+            records = (line for line in source if line.strip())
+            count, elapsed = export(args.game, records, args.output, args.chunk_size)
+    print(f'Позиций: {count} за {elapsed:.2f} с, {count / elapsed if elapsed else 0:.0f} позиций/с')
@@ -0,0 +1,556 @@
+import argparse
+import json
+import mmap
+import multiprocessing
+import os
+from array import array
+from math import comb
+
+from Шашки import Board, Normal, Queen
+
+
+KINDS = 'NQnq'
+SQUARES = [(string, col) for string in range(8) for col in range(8) if (string + col) % 2]
+SQUARE_INDEX = {square: indx for indx, square in enumerate(SQUARES)}
+CLASSES = {'N': (Normal, 'white'), 'Q': (Queen, 'white'), 'n': (Normal, 'black'), 'q': (Queen, 'black')}
+
+MAGIC = b'CKDB'
+VERSION = 1
+HEADER_SIZE = 16
+MAX_DISTANCE = 126
+
+DRAW = 'draw'
+WIN = 'win'
+LOSS = 'loss'
+
+
+def encode_value(result, distance):
+    """Функция для упаковки результата позиции в один байт.
+
+    0 - ничья (или еще не известно), нечетные значения - выигрыш,
+    четные - проигрыш; расстояние в полуходах хранится в старших битах.
+
+    Args:
+        result (str): WIN, LOSS или DRAW
+        distance (int): кол-во полуходов до конца партии
+
+    Returns:
+        int: байт результата
+    """
+
+    if result == DRAW:
+        return 0
+    distance = min(distance, MAX_DISTANCE)
+    return 2 * distance + 1 if result == WIN else 2 * distance + 2
+
+
+def decode_value(value):
+    """Функция для распаковки байта результата.
+
+    Args:
+        value (int): байт результата
+
+    Returns:
+        tuple: результат (WIN, LOSS или DRAW) и расстояние в полуходах
+    """
+
+    if value == 0:
+        return DRAW, 0
+    if value % 2:
+        return WIN, (value - 1) // 2
+    return LOSS, (value - 2) // 2
+
+
+def signatures(max_pieces):
+    """Функция для перечисления наборов материала в порядке решения.
+
+    Набор - кортеж кол-в шашек (N, Q, n, q). Взятие уменьшает общее
+    кол-во шашек, а превращение - кол-во простых шашек, поэтому наборы,
+    от которых зависит текущий, всегда решаются раньше.
+
+    Args:
+        max_pieces (int): максимальное кол-во шашек на доске
+
+    Returns:
+        list: наборы материала
+    """
+
+    result = []
+    for total in range(2, max_pieces + 1):
+        for white_normal in range(total + 1):
+            for white_queen in range(total + 1 - white_normal):
+                for black_normal in range(total + 1 - white_normal - white_queen):
+                    black_queen = total - white_normal - white_queen - black_normal
+                    if white_normal + white_queen and black_normal + black_queen:
+                        result.append((white_normal, white_queen, black_normal, black_queen))
+    result.sort(key=lambda sig: (sum(sig), sig[0] + sig[2], sig))
+    return result
+
+
+def radices(signature):
+    """Функция для получения кол-ва вариантов расстановки каждого вида шашек.
+
+    Args:
+        signature (tuple): набор материала
+
+    Returns:
+        list: кол-во сочетаний для каждого вида шашек
+    """
+
+    result = []
+    free = len(SQUARES)
+    for count in signature:
+        result.append(comb(free, count))
+        free -= count
+    return result
+
+
+def table_size(signature):
+    """Функция для получения кол-ва расстановок набора материала.
+
+    Args:
+        signature (tuple): набор материала
+
+    Returns:
+        int: кол-во расстановок (без учета очереди хода)
+    """
+
+    size = 1
+    for radix in radices(signature):
+        size *= radix
+    return size
+
+
+def encode_position(signature, groups):
+    """Функция для получения индекса расстановки.
+
+    Каждый вид шашек по очереди выбирает клетки из оставшихся свободными,
+    номер сочетания считается комбинаторной системой счисления.
+
+    Args:
+        signature (tuple): набор материала
+        groups (list): для каждого вида шашек отсортированный список номеров клеток
+
+    Returns:
+        int: индекс расстановки
+    """
+
+    index = 0
+    free = list(range(len(SQUARES)))
+    for radix, squares in zip(radices(signature), groups):
+        rank = 0
+        for indx, square in enumerate(squares):
+            rank += comb(free.index(square), indx + 1)
+        index = index * radix + rank
+        free = [square for square in free if square not in squares]
+    return index
+
+
+def decode_position(signature, index):
+    """Функция для восстановления расстановки по индексу.
+
+    Args:
+        signature (tuple): набор материала
+        index (int): индекс расстановки
+
+    Returns:
+        list: для каждого вида шашек отсортированный список номеров клеток
+    """
+
+    sizes = radices(signature)
+    divisors = []
+    divisor = 1
+    for radix in reversed(sizes):
+        divisors.append(divisor)
+        divisor *= radix
+    divisors.reverse()
+
+    groups = []
+    free = list(range(len(SQUARES)))
+    for count, divisor in zip(signature, divisors):
+        rank, index = divmod(index, divisor)
+        ranks = []
+        for indx in range(count, 0, -1):
+            place = indx - 1
+            while comb(place + 1, indx) <= rank:
+                place += 1
+            rank -= comb(place, indx)
+            ranks.append(place)
+        squares = sorted(free[place] for place in ranks)
+        groups.append(squares)
+        free = [square for square in free if square not in squares]
+    return groups
+
+
+def board_groups(board):
+    """Функция для получения набора материала и расстановки с доски.
+
+    Args:
+        board (Board): доска
+
+    Returns:
+        tuple: набор материала и списки номеров клеток для каждого вида шашек
+    """
+
+    groups = {kind: [] for kind in KINDS}
+    for color in ['white', 'black']:
+        for position, checker in board.pieces[color].items():
+            groups[checker.get_symbol()].append(SQUARE_INDEX[position])
+    groups = [sorted(groups[kind]) for kind in KINDS]
+    return tuple(len(group) for group in groups), groups
+
+
+def table_name(signature):
+    """Функция для получения имени файла таблицы.
+
+    Args:
+        signature (tuple): набор материала
+
+    Returns:
+        str: имя файла, например N1Q0n1q1.db
+    """
+
+    return ''.join(f'{kind}{count}' for kind, count in zip(KINDS, signature)) + '.db'
+
+
+def empty_board():
+    """Функция для получения пустой доски.
+
+    Returns:
+        Board: доска без шашек
+    """
+
+    board = Board()
+    for color in ['white', 'black']:
+        for position in list(board.pieces[color]):
+            board.set_piece(position, None)
+    return board
+
+
+class EndgameDatabase(object):
+    """Класс для чтения таблиц эндшпиля. Файлы открываются через mmap при
+    первом обращении, поэтому запрос к таблице стоит O(1).
+
+    Attributes:
+        directory (str): каталог с таблицами
+        tables (dict): открытые таблицы, набор материала -> mmap либо None
+    """
+
+    def __init__(self, directory):
+        """Инициализация базы.
+
+        Args:
+            directory (str): каталог с таблицами
+        """
+
+        self.directory = directory
+        self.tables = {}
+
+    def table(self, signature):
+        """Метод для получения таблицы набора материала.
+
+        Args:
+            signature (tuple): набор материала
+
+        Returns:
+            mmap.mmap: содержимое файла либо None, если таблицы нет
+        """
+
+        if signature not in self.tables:
+            path = os.path.join(self.directory, table_name(signature))
+            if os.path.exists(path):
+                with open(path, 'rb') as file:
+                    data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+                if data[:4] != MAGIC or data[4] != VERSION:
+                    data.close()
+                    raise ValueError(f'{path}: неизвестный формат таблицы')
+                self.tables[signature] = data
+            else:
+                self.tables[signature] = None
+        return self.tables[signature]
+
+    def probe_value(self, signature, groups, color):
+        """Метод для получения байта результата по расстановке.
+
+        Args:
+            signature (tuple): набор материала
+            groups (list): списки номеров клеток для каждого вида шашек
+            color (str): цвет стороны, которая ходит
+
+        Returns:
+            int: байт результата либо None, если таблицы нет
+        """
+
+        white = signature[0] + signature[1]
+        black = signature[2] + signature[3]
+        if not (white if color == 'white' else black):
+            return encode_value(LOSS, 0)
+        data = self.table(signature)
+        if data is None:
+            return None
+        index = encode_position(signature, groups) * 2 + (color == 'black')
+        return data[HEADER_SIZE + index]
+
+    def probe(self, board, color):
+        """Метод для получения точного результата позиции.
+
+        Args:
+            board (Board): доска
+            color (str): цвет стороны, которая ходит
+
+        Returns:
+            tuple: результат (WIN, LOSS или DRAW) и расстояние в полуходах
+            либо None, если позиции нет в базе
+        """
+
+        signature, groups = board_groups(board)
+        value = self.probe_value(signature, groups, color)
+        return None if value is None else decode_value(value)
+
+    def close(self):
+        """Метод для закрытия открытых таблиц."""
+
+        for data in self.tables.values():
+            if data is not None:
+                data.close()
+        self.tables = {}
+
+
+_worker_database = None
+
+
+def _init_worker(directory):
+    """Функция инициализации процесса-решателя.
+
+    Args:
+        directory (str): каталог с таблицами
+    """
+
+    global _worker_database
+    _worker_database = EndgameDatabase(directory)
+
+
+def scan_chunk(task):
+    """Функция для просмотра отрезка индексов перед ретроградным анализом.
+
+    Для каждой еще не решенной позиции один раз перебираются ходы и по уже
+    известным результатам потомков находятся: кратчайший выигрыш (ход в
+    проигранную соперником позицию), самый долгий проигрыш среди ходов в
+    выигранные соперником позиции, кол-во ходов в еще не решенные позиции
+    того же набора и признак хода в ничью. Ходы в нерешенные позиции того
+    же набора возвращаются ребрами, из которых строятся списки предков.
+
+    Args:
+        task (tuple): каталог, набор материала, начало и конец отрезка
+
+    Returns:
+        tuple: массивы индексов позиций, выигрышей (0 - выигрыша нет),
+        проигрышей, кол-в нерешенных потомков, признаки ничьей и массивы
+        ребер (потомок, предок)
+    """
+
+    directory, signature, start, stop = task
+    path = os.path.join(directory, table_name(signature) + '.part')
+    with open(path, 'rb') as file:
+        current = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    board = empty_board()
+    indices, wins, losses, counts = array('I'), array('H'), array('H'), array('H')
+    draws = bytearray()
+    children, parents = array('I'), array('I')
+    try:
+        for index in range(start, stop):
+            if current[HEADER_SIZE + index]:
+                continue
+            position, side = divmod(index, 2)
+            color = 'black' if side else 'white'
+            enemy = 'white' if side else 'black'
+            placed = []
+            for kind, squares in zip(KINDS, decode_position(signature, position)):
+                cls, piece_color = CLASSES[kind]
+                for square in squares:
+                    placed.append(SQUARES[square])
+                    board.set_piece(SQUARES[square], cls(piece_color))
+
+            best_win = 0
+            worst_loss = 0
+            unknown = 0
+            draw = 0
+            for move in board.all_moves(color):
+                undo = board.apply_move(move)
+                child_signature, groups = board_groups(board)
+                if child_signature == signature:
+                    child_index = encode_position(signature, groups) * 2 + (not side)
+                    value = current[HEADER_SIZE + child_index]
+                    if not value:
+                        unknown += 1
+                        children.append(child_index)
+                        parents.append(index)
+                else:
+                    value = _worker_database.probe_value(child_signature, groups, enemy) or 0
+                board.undo_move(undo)
+                if not value:
+                    draw = draw or child_signature != signature
+                    continue
+                result, distance = decode_value(value)
+                if result == LOSS:
+                    best_win = distance + 1 if not best_win else min(best_win, distance + 1)
+                else:
+                    worst_loss = max(worst_loss, distance + 1)
+
+            indices.append(index)
+            wins.append(best_win)
+            losses.append(worst_loss)
+            counts.append(unknown)
+            draws.append(draw)
+            for square in placed:
+                board.set_piece(square, None)
+    finally:
+        current.close()
+    return indices, wins, losses, counts, draws, children, parents
+
+
+def solve(pool, directory, signature, part, state, iteration, chunk_size):
+    """Функция для ретроградного анализа одного набора материала.
+
+    Сначала пул процессов один раз просматривает нерешенные позиции
+    (scan_chunk), и по ребрам строятся списки предков. Затем позиции
+    решаются по возрастанию расстояния: выигрыш - первый найденный ход в
+    проигрыш соперника, проигрыш - когда решен последний потомок и все
+    потомки выиграны соперником. После решения позиции пересматриваются
+    только ее предки, поэтому ничейные позиции больше не перебираются.
+    После каждого расстояния таблица и номер итерации записываются на
+    диск; при продолжении просмотр повторяется по уже решенным позициям.
+
+    Args:
+        pool (multiprocessing.Pool): пул процессов
+        directory (str): каталог для таблиц
+        signature (tuple): набор материала
+        part (str): путь к файлу таблицы, которая строится
+        state (str): путь к файлу с номером итерации
+        iteration (int): первое расстояние, которое еще не записано
+        chunk_size (int): кол-во индексов в одной задаче
+
+    Returns:
+        int: кол-во итераций (последнее расстояние плюс один)
+    """
+
+    total = table_size(signature) * 2
+    worst = array('H', [0]) * total
+    remaining = array('H', [0]) * total
+    blocked = bytearray(total)
+    winning = bytearray(total)
+    buckets = {}
+
+    def push(index, result, distance):
+        if result == WIN:
+            winning[index] = 1
+        buckets.setdefault(max(distance, iteration), []).append((index, result))
+
+    tasks = [(directory, signature, start, min(start + chunk_size, total))
+             for start in range(0, total, chunk_size)]
+    edge_children, edge_parents = array('I'), array('I')
+    for indices, wins, losses, counts, draws, children, parents in pool.imap_unordered(scan_chunk, tasks):
+        for indx, index in enumerate(indices):
+            worst[index] = losses[indx]
+            remaining[index] = counts[indx]
+            blocked[index] = draws[indx]
+            if wins[indx]:
+                push(index, WIN, wins[indx])
+            elif not counts[indx] and not draws[indx]:
+                push(index, LOSS, losses[indx])
+        edge_children.extend(children)
+        edge_parents.extend(parents)
+
+    offsets = array('I', [0]) * (total + 1)
+    for child in edge_children:
+        offsets[child + 1] += 1
+    for indx in range(total):
+        offsets[indx + 1] += offsets[indx]
+    fill = array('I', offsets)
+    predecessors = array('I', [0]) * len(edge_children)
+    for child, parent in zip(edge_children, edge_parents):
+        predecessors[fill[child]] = parent
+        fill[child] += 1
+    del edge_children, edge_parents, fill
+
+    with open(part, 'r+b') as file:
+        data = mmap.mmap(file.fileno(), 0)
+    try:
+        while buckets:
+            queue = buckets.get(iteration, [])
+            pos = 0
+            while pos < len(queue):
+                index, result = queue[pos]
+                pos += 1
+                if data[HEADER_SIZE + index]:
+                    continue
+                value = encode_value(result, iteration)
+                data[HEADER_SIZE + index] = value
+                distance = decode_value(value)[1] + 1
+                for parent in predecessors[offsets[index]:offsets[index + 1]]:
+                    if data[HEADER_SIZE + parent]:
+                        continue
+                    if result == LOSS:
+                        push(parent, WIN, distance)
+                        continue
+                    worst[parent] = max(worst[parent], distance)
+                    remaining[parent] -= 1
+                    if not remaining[parent] and not blocked[parent] and not winning[parent]:
+                        push(parent, LOSS, worst[parent])
+            buckets.pop(iteration, None)
+            data.flush()
+            with open(state + '.tmp', 'w') as file:
+                json.dump({'iteration': iteration}, file)
+            os.replace(state + '.tmp', state)
+            iteration += 1
+    finally:
+        data.close()
+    return iteration
+
+
+def generate(directory, max_pieces, workers=None, chunk_size=4096):
+    """Функция для построения таблиц эндшпиля ретроградным анализом.
+
+    Наборы материала решаются по очереди функцией solve. После каждой
+    итерации на диск записываются и таблица, и номер итерации, поэтому
+    прерванное построение продолжается с того же места.
+
+    Args:
+        directory (str): каталог для таблиц
+        max_pieces (int): максимальное кол-во шашек на доске
+        workers (int): кол-во процессов, по умолчанию по числу ядер
+        chunk_size (int): кол-во индексов в одной задаче
+    """
+
+    os.makedirs(directory, exist_ok=True)
+    with multiprocessing.Pool(workers, initializer=_init_worker, initargs=(directory,)) as pool:
+        for signature in signatures(max_pieces):
+            final = os.path.join(directory, table_name(signature))
+            if os.path.exists(final):
+                continue
+            part = final + '.part'
+            state = final + '.state'
+            total = table_size(signature) * 2
+            iteration = 0
+            if os.path.exists(part) and os.path.exists(state):
+                with open(state) as file:
+                    iteration = json.load(file)['iteration'] + 1
+            else:
+                with open(part, 'wb') as file:
+                    file.write((MAGIC + bytes([VERSION] + list(signature))).ljust(HEADER_SIZE, b'\0'))
+                    file.truncate(HEADER_SIZE + total)
+
+            iterations = solve(pool, directory, signature, part, state, iteration, chunk_size)
+            os.replace(part, final)
+            if os.path.exists(state):
+                os.remove(state)
+            print(f'{table_name(signature)}: {total} позиций, итераций: {iterations}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Построение таблиц эндшпиля для шашек')
+    parser.add_argument('--pieces', type=int, default=3, help='максимальное кол-во шашек')
+    parser.add_argument('--dir', default='endgames', help='каталог для таблиц')
+    parser.add_argument('--workers', type=int, default=None, help='кол-во процессов')
+    args = parser.parse_args()
+    generate(args.dir, args.pieces, args.workers)